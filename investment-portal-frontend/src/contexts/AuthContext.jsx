@@ -22,20 +22,16 @@ export const AuthProvider = ({ children }) => {
 
   const checkAuthStatus = async () => {
     try {
-      const response = await fetch('/api/auth/status', {
+      // Auth status and profile in one round trip
+      const response = await fetch('/api/auth/bootstrap', {
         credentials: 'include'
       })
       const data = await response.json()
       
       if (data.authenticated) {
         setIsAuthenticated(true)
-        // Get user profile
-        const profileResponse = await fetch('/api/auth/profile', {
-          credentials: 'include'
-        })
-        if (profileResponse.ok) {
-          const profileData = await profileResponse.json()
-          setUser(profileData.client)
+        if (data.client) {
+          setUser(data.client)
         }
       }
     } catch (error) {
@@ -1,5 +1,7 @@
 import os
 import sys
+import json
+import click
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
@@ -8,9 +10,21 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 from src.models.user import db
 from src.models.client import Client
+from src.models.plaid import PlaidItem
+from src.models.security import Security, SecurityPrice
+from src.models.holding import Holding, ClientValuation
+from src.models.transaction import InvestmentTransaction
+from src.models.tax_lot import TaxLot, RealizedGain, LotSelection, LotCursor
+from src.models.job import Job
+from src.models.analytics import DailyActivity
 from src.routes.auth import auth_bp
 from src.routes.plaid import plaid_bp
 from src.routes.admin import admin_bp
+from src.utils.audit_archive import archive_audit_logs, ensure_audit_partitions, partition_audit_logs
+from src.utils.revaluation import run_revaluation
+from src.utils.jobs import run_workers, start_workers
+from src.utils.rollups import rebuild_rollups
+from src.utils.tax_lots import run_gain_reports
 
 # Load environment variables
 load_dotenv()
@@ -39,6 +53,65 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 with app.app_context():
     db.create_all()
+    # create_all skips existing tables, so add indexes declared since they were created
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    ensure_audit_partitions()
+
+@app.cli.command('partition-audit-logs')
+def partition_audit_logs_command():
+    """Convert audit_logs to monthly partitions (PostgreSQL only)"""
+    if partition_audit_logs():
+        print('audit_logs is now partitioned by month')
+    else:
+        print('audit_logs is already partitioned')
+
+@app.cli.command('archive-audit-logs')
+def archive_audit_logs_command():
+    """Move audit logs past the retention window into compressed archives"""
+    archived = archive_audit_logs()
+    for name, count in archived.items():
+        print(f'{name}: archived {count} rows')
+    if not archived:
+        print('Nothing to archive')
+
+@app.cli.command('revalue-holdings')
+@click.argument('price_file')
+@click.option('--date', 'price_date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Close date for rows without their own date (defaults to today)')
+def revalue_holdings_command(price_file, price_date):
+    """Load an end-of-day price file and revalue every stored holding"""
+    summary = run_revaluation(price_file, price_date.date() if price_date else None)
+    for key, value in summary.items():
+        print(f'{key}: {value}')
+
+@app.cli.command('rebuild-activity-rollups')
+def rebuild_activity_rollups_command():
+    """Recompute daily growth and activity rollups from clients and audit logs"""
+    days = rebuild_rollups()
+    print(f'Rebuilt rollups for {days} day(s)')
+
+@app.cli.command('tax-lot-report')
+@click.option('--year', type=int, default=None, help='Only count gains realized in this tax year')
+def tax_lot_report_command(year):
+    """Bring every client's tax lots up to date and print one gain report per line"""
+    summary = run_gain_reports(year)
+    for report in summary['reports']:
+        print(json.dumps(report))
+    print(f"Applied {summary['transactions_applied']} transaction(s) for {summary['clients_updated']} client(s)",
+          file=sys.stderr)
+
+@app.cli.command('run-jobs')
+@click.option('--threads', default=4, show_default=True, help='Number of worker threads')
+def run_jobs_command(threads):
+    """Run a background job worker pool until interrupted"""
+    print(f'Job worker running with {threads} thread(s)')
+    run_workers(app, threads)
+
+# Optionally run job workers inside the web process
+if int(os.getenv('JOB_WORKER_THREADS', '0')) > 0:
+    start_workers(app, int(os.getenv('JOB_WORKER_THREADS')))
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -48,6 +48,10 @@ class AdminUser(db.Model):
 
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        db.Index('ix_audit_logs_timestamp', 'timestamp'),
+        db.Index('ix_audit_logs_admin_user_id_timestamp', 'admin_user_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     admin_user_id = db.Column(db.Integer, db.ForeignKey('admin_users.id'), nullable=False)
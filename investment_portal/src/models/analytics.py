@@ -0,0 +1,21 @@
+from src.models.user import db
+
+class DailyActivity(db.Model):
+    """Per-day client growth and activity counters, maintained incrementally"""
+    __tablename__ = 'daily_activity'
+    
+    day = db.Column(db.Date, primary_key=True)
+    signups = db.Column(db.Integer, nullable=False, default=0)
+    active_logins = db.Column(db.Integer, nullable=False, default=0)  # distinct clients logging in
+    activations = db.Column(db.Integer, nullable=False, default=0)
+    suspensions = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        """Convert rollup row to dictionary"""
+        return {
+            'day': self.day.isoformat(),
+            'signups': self.signups,
+            'active_logins': self.active_logins,
+            'activations': self.activations,
+            'suspensions': self.suspensions
+        }
@@ -1,11 +1,14 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
-
-db = SQLAlchemy()
+from src.models.user import db
 
 class Client(db.Model):
     """Client model for storing client information and Plaid integration data"""
+    __table_args__ = (
+        db.Index('ix_client_created_at', 'created_at'),
+        db.Index('ix_client_is_active_created_at', 'is_active', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
@@ -23,6 +26,9 @@ class Client(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
     
+    # Linked institutions (one Plaid item per institution)
+    plaid_items = db.relationship('PlaidItem', backref='client', lazy=True, cascade='all, delete-orphan')
+    
     def __repr__(self):
         return f'<Client {self.email}>'
     
@@ -42,7 +48,7 @@ class Client(db.Model):
     
     def has_plaid_connection(self):
         """Check if client has connected Plaid account"""
-        return bool(self.plaid_access_token and self.plaid_item_id)
+        return bool(self.plaid_access_token and self.plaid_item_id) or bool(self.plaid_items)
     
     def to_dict(self, include_sensitive=False):
         """Convert client to dictionary"""
@@ -56,7 +62,8 @@ class Client(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'last_login': self.last_login.isoformat() if self.last_login else None,
             'has_plaid_connection': self.has_plaid_connection(),
-            'plaid_connected_at': self.plaid_connected_at.isoformat() if self.plaid_connected_at else None
+            'plaid_connected_at': self.plaid_connected_at.isoformat() if self.plaid_connected_at else None,
+            'plaid_item_count': len(self.plaid_items)
         }
         
         if include_sensitive:
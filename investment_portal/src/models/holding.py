@@ -0,0 +1,54 @@
+from datetime import datetime
+from src.models.user import db
+
+class Holding(db.Model):
+    """A stored position, refreshed on Plaid sync and revalued from EOD prices"""
+    __tablename__ = 'holdings'
+    __table_args__ = (
+        db.Index('ix_holdings_client_id', 'client_id'),
+        db.Index('ix_holdings_security_id', 'security_id'),
+        db.Index('ix_holdings_plaid_item_id', 'plaid_item_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    plaid_item_id = db.Column(db.Integer, db.ForeignKey('plaid_items.id', ondelete='CASCADE'), nullable=True)
+    account_id = db.Column(db.String(255), nullable=False)
+    security_id = db.Column(db.String(100), db.ForeignKey('securities.security_id'), nullable=False)
+    quantity = db.Column(db.Float, nullable=False, default=0.0)
+    cost_basis = db.Column(db.Float, nullable=True)
+    institution_price = db.Column(db.Float, nullable=True)
+    institution_value = db.Column(db.Float, nullable=True)
+    price_as_of = db.Column(db.Date, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert holding to the Plaid-shaped dictionary"""
+        return {
+            'account_id': self.account_id,
+            'security_id': self.security_id,
+            'quantity': self.quantity,
+            'institution_price': self.institution_price,
+            'institution_value': self.institution_value,
+            'cost_basis': self.cost_basis,
+            'price_as_of': self.price_as_of.isoformat() if self.price_as_of else None
+        }
+
+class ClientValuation(db.Model):
+    """Per-client portfolio total from the latest revaluation"""
+    __tablename__ = 'client_valuations'
+    
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), primary_key=True)
+    total_value = db.Column(db.Float, nullable=False, default=0.0)
+    holding_count = db.Column(db.Integer, nullable=False, default=0)
+    as_of = db.Column(db.Date, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert valuation to dictionary"""
+        return {
+            'client_id': self.client_id,
+            'total_value': self.total_value,
+            'holding_count': self.holding_count,
+            'as_of': self.as_of.isoformat() if self.as_of else None
+        }
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+from src.models.user import db
+
+class Job(db.Model):
+    """A unit of background work leased and run by a job worker"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_priority_run_after', 'status', 'priority', 'run_after'),
+        db.Index('ix_jobs_status_locked_until', 'status', 'locked_until'),
+        db.Index('ix_jobs_status_id', 'status', 'id'),
+        db.Index('ix_jobs_client_id', 'client_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # e.g., 'plaid_sync', 'revalue_holdings'
+    payload = db.Column(db.Text, nullable=True)  # JSON arguments for the handler
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    priority = db.Column(db.Integer, nullable=False, default=0)  # higher runs first
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    progress = db.Column(db.Float, nullable=False, default=0.0)  # percent complete
+    progress_message = db.Column(db.String(255), nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON result from the handler
+    error = db.Column(db.Text, nullable=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=True)
+    admin_user_id = db.Column(db.Integer, db.ForeignKey('admin_users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.job_type} {self.status}>'
+    
+    def to_dict(self):
+        """Convert job to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'priority': self.priority,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'progress': self.progress,
+            'progress_message': self.progress_message,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,37 @@
+from datetime import datetime
+from src.models.user import db
+
+class PlaidItem(db.Model):
+    """A linked institution (Plaid item) belonging to a client"""
+    __tablename__ = 'plaid_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False, index=True)
+    item_id = db.Column(db.String(255), unique=True, nullable=False)
+    access_token = db.Column(db.String(255), nullable=False)
+    institution_id = db.Column(db.String(100), nullable=True)
+    institution_name = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_synced_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    
+    def __repr__(self):
+        return f'<PlaidItem {self.item_id}>'
+    
+    def to_dict(self, include_sensitive=False):
+        """Convert item to dictionary"""
+        data = {
+            'id': self.id,
+            'client_id': self.client_id,
+            'item_id': self.item_id,
+            'institution_id': self.institution_id,
+            'institution_name': self.institution_name,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_synced_at': self.last_synced_at.isoformat() if self.last_synced_at else None,
+            'last_error': self.last_error
+        }
+        
+        if include_sensitive:
+            data['access_token'] = self.access_token
+        
+        return data
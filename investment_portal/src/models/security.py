@@ -0,0 +1,41 @@
+from datetime import datetime
+from src.models.user import db
+
+class Security(db.Model):
+    """Shared security master, one row per instrument across all clients"""
+    __tablename__ = 'securities'
+    
+    security_id = db.Column(db.String(100), primary_key=True)
+    ticker_symbol = db.Column(db.String(20), nullable=True, index=True)
+    name = db.Column(db.String(255), nullable=True)
+    type = db.Column(db.String(50), nullable=True)  # e.g., 'equity', 'etf'
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Security {self.ticker_symbol or self.security_id}>'
+    
+    def to_dict(self):
+        """Convert security to the Plaid-shaped dictionary"""
+        return {
+            'security_id': self.security_id,
+            'name': self.name,
+            'ticker_symbol': self.ticker_symbol,
+            'type': self.type
+        }
+
+class SecurityPrice(db.Model):
+    """Latest end-of-day close per security, loaded from price files"""
+    __tablename__ = 'security_prices'
+    
+    security_id = db.Column(db.String(100), db.ForeignKey('securities.security_id'), primary_key=True)
+    close_price = db.Column(db.Float, nullable=False)
+    price_date = db.Column(db.Date, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert price to dictionary"""
+        return {
+            'security_id': self.security_id,
+            'close_price': self.close_price,
+            'price_date': self.price_date.isoformat() if self.price_date else None
+        }
@@ -0,0 +1,93 @@
+from datetime import datetime
+from src.models.user import db
+
+class TaxLot(db.Model):
+    """An acquisition lot, drawn down by later sells"""
+    __tablename__ = 'tax_lots'
+    __table_args__ = (
+        db.Index('ix_tax_lots_open', 'client_id', 'account_id', 'security_id', 'is_open', 'acquired_date', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    account_id = db.Column(db.String(255), nullable=False)
+    security_id = db.Column(db.String(100), nullable=False)
+    open_transaction_id = db.Column(db.Integer, db.ForeignKey('investment_transactions.id'), nullable=True)
+    acquired_date = db.Column(db.Date, nullable=False)
+    quantity_original = db.Column(db.Float, nullable=False)
+    quantity_open = db.Column(db.Float, nullable=False)
+    cost_per_unit = db.Column(db.Float, nullable=False)
+    is_open = db.Column(db.Boolean, nullable=False, default=True)
+    
+    def to_dict(self):
+        """Convert lot to dictionary"""
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'security_id': self.security_id,
+            'open_transaction_id': self.open_transaction_id,
+            'acquired_date': self.acquired_date.isoformat() if self.acquired_date else None,
+            'quantity_original': self.quantity_original,
+            'quantity_open': self.quantity_open,
+            'cost_per_unit': self.cost_per_unit,
+            'cost_basis': round(self.quantity_open * self.cost_per_unit, 2),
+            'is_open': self.is_open
+        }
+
+class RealizedGain(db.Model):
+    """The part of a sell matched against one lot"""
+    __tablename__ = 'realized_gains'
+    __table_args__ = (
+        db.Index('ix_realized_gains_client_sold_date', 'client_id', 'sold_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    account_id = db.Column(db.String(255), nullable=False)
+    security_id = db.Column(db.String(100), nullable=False)
+    lot_id = db.Column(db.Integer, db.ForeignKey('tax_lots.id'), nullable=True)  # None when no lot covered the sell
+    sell_transaction_id = db.Column(db.Integer, db.ForeignKey('investment_transactions.id'), nullable=False)
+    acquired_date = db.Column(db.Date, nullable=True)
+    sold_date = db.Column(db.Date, nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    proceeds = db.Column(db.Float, nullable=False)
+    cost_basis = db.Column(db.Float, nullable=True)
+    gain = db.Column(db.Float, nullable=True)
+    term = db.Column(db.String(10), nullable=True)  # short, long
+    
+    def to_dict(self):
+        """Convert realized gain to dictionary"""
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'security_id': self.security_id,
+            'lot_id': self.lot_id,
+            'sell_transaction_id': self.sell_transaction_id,
+            'acquired_date': self.acquired_date.isoformat() if self.acquired_date else None,
+            'sold_date': self.sold_date.isoformat() if self.sold_date else None,
+            'quantity': self.quantity,
+            'proceeds': self.proceeds,
+            'cost_basis': self.cost_basis,
+            'gain': self.gain,
+            'term': self.term
+        }
+
+class LotSelection(db.Model):
+    """Specific-ID instruction: draw a sell from a chosen lot before FIFO"""
+    __tablename__ = 'lot_selections'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False, index=True)
+    sell_transaction_id = db.Column(db.Integer, db.ForeignKey('investment_transactions.id'), nullable=False, index=True)
+    open_transaction_id = db.Column(db.Integer, db.ForeignKey('investment_transactions.id'), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class LotCursor(db.Model):
+    """How far each client's transaction history has been applied to lots"""
+    __tablename__ = 'lot_cursors'
+    
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), primary_key=True)
+    last_transaction_id = db.Column(db.Integer, nullable=False, default=0)
+    last_date = db.Column(db.Date, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,43 @@
+from datetime import datetime
+from src.models.user import db
+
+class InvestmentTransaction(db.Model):
+    """A stored investment transaction, appended on Plaid sync"""
+    __tablename__ = 'investment_transactions'
+    __table_args__ = (
+        db.UniqueConstraint('plaid_item_id', 'transaction_id', name='uq_investment_transactions_item_transaction'),
+        db.Index('ix_investment_transactions_client_date', 'client_id', 'date', 'id'),
+        db.Index('ix_investment_transactions_client_account_date', 'client_id', 'account_id', 'date', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    plaid_item_id = db.Column(db.Integer, db.ForeignKey('plaid_items.id', ondelete='SET NULL'), nullable=True)
+    transaction_id = db.Column(db.String(255), nullable=False)  # Plaid investment_transaction_id
+    account_id = db.Column(db.String(255), nullable=False)
+    security_id = db.Column(db.String(100), nullable=True)
+    date = db.Column(db.Date, nullable=False)
+    name = db.Column(db.String(255), nullable=True)
+    type = db.Column(db.String(50), nullable=True)  # e.g., 'buy', 'sell', 'cash', 'fee'
+    subtype = db.Column(db.String(50), nullable=True)
+    quantity = db.Column(db.Float, nullable=True)
+    price = db.Column(db.Float, nullable=True)
+    amount = db.Column(db.Float, nullable=True)
+    fees = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert transaction to the Plaid-shaped dictionary"""
+        return {
+            'transaction_id': self.transaction_id,
+            'account_id': self.account_id,
+            'security_id': self.security_id,
+            'date': self.date.isoformat() if self.date else None,
+            'name': self.name,
+            'type': self.type,
+            'subtype': self.subtype,
+            'quantity': self.quantity,
+            'price': self.price,
+            'amount': self.amount,
+            'fees': self.fees
+        }
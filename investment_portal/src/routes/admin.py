@@ -1,9 +1,20 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, session, stream_with_context
 from functools import wraps
 from datetime import datetime
+from sqlalchemy import update
 from src.models.admin import AdminUser, AuditLog
 from src.models.client import Client
+from src.models.job import Job
 from src.models.user import db
+from src.utils.rate_limit import rate_limit
+from src.utils.admin_events import DashboardPublisher
+from src.utils.audit_archive import iter_audit_logs
+from src.utils.client_listing import client_filter_criteria, fetch_client_page
+from src.utils.profile_cache import profile_cache
+from src.utils.jobs import enqueue_job
+from src.utils.rollups import GRANULARITIES, activity_series, record_activity, signups_since
+from src.utils.revaluation import get_aum_summary, resolve_price_file
+import json
 import logging
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
@@ -43,8 +54,22 @@ def log_admin_action(action, resource_type, resource_id=None, details=None):
     except Exception as e:
         logging.error(f"Failed to log admin action: {e}")
 
+def build_audit_entry(action, resource_type, resource_id=None, details=None):
+    """Build an audit log row for bulk insertion"""
+    return {
+        'admin_user_id': request.admin_user.id,
+        'action': action,
+        'resource_type': resource_type,
+        'resource_id': str(resource_id) if resource_id else None,
+        'details': details,
+        'ip_address': request.remote_addr,
+        'user_agent': request.headers.get('User-Agent', '')[:255],
+        'timestamp': datetime.utcnow()
+    }
+
 # Authentication Routes
 @admin_bp.route('/login', methods=['POST'])
+@rate_limit('admin_login', ip_limit=(10, 60), account_field='username')
 def admin_login():
     """Admin login endpoint"""
     try:
@@ -107,39 +132,12 @@ def get_all_clients():
         search = request.args.get('search', '')
         status = request.args.get('status', '')
         
-        query = Client.query
-        
-        # Apply search filter
-        if search:
-            query = query.filter(
-                db.or_(
-                    Client.first_name.ilike(f'%{search}%'),
-                    Client.last_name.ilike(f'%{search}%'),
-                    Client.email.ilike(f'%{search}%')
-                )
-            )
-        
-        # Apply status filter
-        if status:
-            is_active = status.lower() == 'active'
-            query = query.filter(Client.is_active == is_active)
-        
-        # Paginate results
-        clients = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        # Column-projected read path; no ORM objects per row
+        clients = fetch_client_page(search, status, page, per_page)
         
         log_admin_action('view_clients', 'client_list', details=f'Page {page}, Search: {search}')
         
-        return jsonify({
-            'clients': [client.to_dict() for client in clients.items],
-            'total': clients.total,
-            'pages': clients.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        return jsonify(clients), 200
         
     except Exception as e:
         logging.error(f"Get clients error: {e}")
@@ -183,16 +181,20 @@ def update_client_status(client_id):
             return jsonify({'error': 'is_active field required'}), 400
         
         old_status = client.is_active
-        client.is_active = new_status
-        db.session.commit()
-        
-        action = 'activate_client' if new_status else 'suspend_client'
-        log_admin_action(
-            action, 
-            'client', 
-            client_id, 
-            f'Status changed from {old_status} to {new_status}'
-        )
+        # A no-op update is neither counted nor audited, matching the batch endpoint
+        if old_status != new_status:
+            client.is_active = new_status
+            record_activity(**{'activations' if new_status else 'suspensions': 1})
+            db.session.commit()
+            profile_cache.bump(client_id)
+            
+            action = 'activate_client' if new_status else 'suspend_client'
+            log_admin_action(
+                action, 
+                'client', 
+                client_id, 
+                f'Status changed from {old_status} to {new_status}'
+            )
         
         return jsonify({
             'message': f'Client {"activated" if new_status else "suspended"} successfully',
@@ -203,27 +205,151 @@ def update_client_status(client_id):
         logging.error(f"Update client status error: {e}")
         return jsonify({'error': 'Failed to update client status'}), 500
 
+MAX_BATCH_STATUS_IDS = 10000
+
+@admin_bp.route('/clients/status', methods=['PUT'])
+@admin_required
+def batch_update_client_status():
+    """Update account status for many clients in one statement"""
+    try:
+        data = request.get_json() or {}
+        
+        new_status = data.get('is_active')
+        if not isinstance(new_status, bool):
+            return jsonify({'error': 'is_active field required'}), 400
+        
+        client_ids = data.get('client_ids')
+        client_filter = data.get('filter')
+        if bool(client_ids) == bool(client_filter):
+            return jsonify({'error': 'Provide either client_ids or filter'}), 400
+        
+        if client_ids:
+            try:
+                requested_ids = list(dict.fromkeys(int(client_id) for client_id in client_ids))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'client_ids must be a list of integers'}), 400
+            if len(requested_ids) > MAX_BATCH_STATUS_IDS:
+                return jsonify({'error': f'At most {MAX_BATCH_STATUS_IDS} client_ids per request'}), 400
+            criteria = [Client.id.in_(requested_ids)]
+        else:
+            if not isinstance(client_filter, dict):
+                return jsonify({'error': 'filter must be an object'}), 400
+            criteria = client_filter_criteria(
+                client_filter.get('search', ''),
+                client_filter.get('status', '')
+            )
+            if not criteria:
+                return jsonify({'error': 'filter must include search or status'}), 400
+            requested_ids = None
+        
+        # Snapshot current status of every targeted client in one query. Filter
+        # mode is capped like client_ids and the UPDATE is confined to the rows
+        # snapshotted, so one request never touches more than the cap
+        snapshot = db.session.query(Client.id, Client.is_active).filter(*criteria)
+        if requested_ids is None:
+            snapshot = snapshot.order_by(Client.id).limit(MAX_BATCH_STATUS_IDS + 1)
+        current = dict(snapshot.with_for_update().all())
+        if requested_ids is None:
+            if len(current) > MAX_BATCH_STATUS_IDS:
+                db.session.rollback()
+                return jsonify({
+                    'error': f'filter matches more than {MAX_BATCH_STATUS_IDS} clients; narrow it or pass client_ids'
+                }), 400
+            criteria.append(Client.id.in_(list(current)))
+        changed_ids = [client_id for client_id, is_active in current.items() if is_active != new_status]
+        
+        statement = update(Client).where(
+            *criteria,
+            Client.is_active != new_status
+        ).values(is_active=new_status).execution_options(synchronize_session=False)
+        if db.engine.dialect.update_returning:
+            # Report and audit exactly the rows the UPDATE changed. FOR UPDATE is a
+            # no-op on SQLite, so the snapshot alone can be stale there
+            changed_ids = db.session.execute(statement.returning(Client.id)).scalars().all()
+            for client_id in changed_ids:
+                current[client_id] = not new_status
+        elif changed_ids:
+            # No RETURNING: the locked snapshot decides the split
+            db.session.execute(statement)
+            
+        if changed_ids:
+            action = 'activate_client' if new_status else 'suspend_client'
+            db.session.execute(
+                AuditLog.__table__.insert(),
+                [
+                    build_audit_entry(
+                        action,
+                        'client',
+                        client_id,
+                        f'Status changed from {current[client_id]} to {new_status} (batch)'
+                    )
+                    for client_id in changed_ids
+                ]
+            )
+            record_activity(**{'activations' if new_status else 'suspensions': len(changed_ids)})
+        db.session.commit()
+        profile_cache.bump(*changed_ids)
+        
+        changed = set(changed_ids)
+        results = []
+        for client_id in (requested_ids if requested_ids is not None else current):
+            if client_id not in current:
+                outcome = 'not_found'
+            elif client_id in changed:
+                outcome = 'updated'
+            else:
+                outcome = 'unchanged'
+            results.append({'client_id': client_id, 'result': outcome})
+        
+        summary = {'updated': len(changed), 'unchanged': len(current) - len(changed)}
+        summary['not_found'] = len(results) - len(current)
+        
+        return jsonify({
+            'message': f'{len(changed)} client(s) {"activated" if new_status else "suspended"}',
+            'is_active': new_status,
+            'summary': summary,
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Batch update client status error: {e}")
+        return jsonify({'error': 'Failed to update client status'}), 500
+
 # Dashboard Routes
+def compute_dashboard_stats():
+    """Compute the dashboard statistics payload"""
+    # Get basic statistics
+    total_clients = Client.query.count()
+    active_clients = Client.query.filter_by(is_active=True).count()
+    inactive_clients = total_clients - active_clients
+    
+    # Mock portfolio data (would be real data from Plaid in production)
+    stats = {
+        'total_clients': total_clients,
+        'active_clients': active_clients,
+        'inactive_clients': inactive_clients,
+        'total_aum': 15750000.00,  # Mock total AUM
+        'average_portfolio_value': 125000.00,
+        'new_clients_this_month': signups_since(datetime.utcnow().date().replace(day=1)),
+        'total_transactions_today': 45
+    }
+    
+    # Use the latest end-of-day revaluation once one has run
+    aum_summary = get_aum_summary()
+    if aum_summary:
+        stats.update(aum_summary)
+    
+    return stats
+
+dashboard_publisher = DashboardPublisher(compute_dashboard_stats)
+
 @admin_bp.route('/dashboard/stats', methods=['GET'])
 @admin_required
 def get_dashboard_stats():
     """Get dashboard statistics"""
     try:
-        # Get basic statistics
-        total_clients = Client.query.count()
-        active_clients = Client.query.filter_by(is_active=True).count()
-        inactive_clients = total_clients - active_clients
-        
-        # Mock portfolio data (would be real data from Plaid in production)
-        stats = {
-            'total_clients': total_clients,
-            'active_clients': active_clients,
-            'inactive_clients': inactive_clients,
-            'total_aum': 15750000.00,  # Mock total AUM
-            'average_portfolio_value': 125000.00,
-            'new_clients_this_month': 12,
-            'total_transactions_today': 45
-        }
+        stats = compute_dashboard_stats()
         
         log_admin_action('view_dashboard', 'dashboard_stats')
         
@@ -233,6 +359,53 @@ def get_dashboard_stats():
         logging.error(f"Get dashboard stats error: {e}")
         return jsonify({'error': 'Failed to retrieve dashboard statistics'}), 500
 
+@admin_bp.route('/dashboard/stream', methods=['GET'])
+@admin_required
+def stream_dashboard():
+    """Push dashboard stats deltas and new audit logs as Server-Sent Events"""
+    try:
+        log_admin_action('open_dashboard_stream', 'dashboard_stats')
+        
+        subscriber = dashboard_publisher.subscribe(
+            current_app._get_current_object(),
+            request.headers.get('Last-Event-ID')
+        )
+        
+        return Response(
+            dashboard_publisher.stream(subscriber),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        logging.error(f"Dashboard stream error: {e}")
+        return jsonify({'error': 'Failed to open dashboard stream'}), 500
+
+@admin_bp.route('/analytics/growth', methods=['GET'])
+@admin_required
+def get_growth_analytics():
+    """Client growth and activity series by week, month or quarter"""
+    try:
+        granularity = request.args.get('granularity', 'month')
+        periods = request.args.get('periods', 12, type=int)
+        
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': f'granularity must be one of {", ".join(GRANULARITIES)}'}), 400
+        if not 1 <= periods <= 104:
+            return jsonify({'error': 'periods must be between 1 and 104'}), 400
+        
+        log_admin_action('view_analytics', 'dashboard_stats', details=f'{granularity} x {periods}')
+        
+        return jsonify({
+            'granularity': granularity,
+            'periods': periods,
+            'series': activity_series(granularity, periods)
+        }), 200
+        
+    except Exception as e:
+        logging.error(f"Get growth analytics error: {e}")
+        return jsonify({'error': 'Failed to retrieve analytics'}), 500
+
 # Audit Log Routes
 @admin_bp.route('/audit-logs', methods=['GET'])
 @admin_required
@@ -260,3 +433,138 @@ def get_audit_logs():
         logging.error(f"Get audit logs error: {e}")
         return jsonify({'error': 'Failed to retrieve audit logs'}), 500
 
+@admin_bp.route('/audit-logs/export', methods=['GET'])
+@admin_required
+def export_audit_logs():
+    """Export audit logs as JSONL, reading archived months transparently"""
+    try:
+        start = request.args.get('start_date')
+        end = request.args.get('end_date')
+        try:
+            start = datetime.fromisoformat(start) if start else None
+            end = datetime.fromisoformat(end) if end else None
+        except ValueError:
+            return jsonify({'error': 'Dates must be ISO formatted'}), 400
+        
+        log_admin_action('export_audit_logs', 'audit_log', details=f'Start: {start}, End: {end}')
+        
+        def generate():
+            for row in iter_audit_logs(start, end):
+                yield json.dumps(row) + '\n'
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': 'attachment; filename=audit_logs.jsonl'}
+        )
+        
+    except Exception as e:
+        logging.error(f"Export audit logs error: {e}")
+        return jsonify({'error': 'Failed to export audit logs'}), 500
+
+# Background Job Routes
+ADMIN_JOB_TYPES = ('revalue_holdings', 'archive_audit_logs', 'export_audit_logs', 'plaid_sync', 'tax_lot_report')
+
+@admin_bp.route('/jobs', methods=['POST'])
+@admin_required
+def create_job():
+    """Queue a long-running operation and return its job ID"""
+    try:
+        data = request.get_json() or {}
+        job_type = data.get('job_type')
+        payload = data.get('payload') or {}
+        
+        if job_type not in ADMIN_JOB_TYPES:
+            return jsonify({'error': f'job_type must be one of {", ".join(ADMIN_JOB_TYPES)}'}), 400
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'payload must be an object'}), 400
+        if job_type == 'revalue_holdings':
+            if not payload.get('price_file'):
+                return jsonify({'error': 'payload.price_file is required'}), 400
+            try:
+                resolve_price_file(payload['price_file'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        if job_type == 'plaid_sync' and not payload.get('client_id'):
+            return jsonify({'error': 'payload.client_id is required'}), 400
+        try:
+            priority = int(data.get('priority', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'priority must be an integer'}), 400
+        
+        job = enqueue_job(
+            job_type,
+            payload,
+            priority=priority,
+            client_id=payload.get('client_id'),
+            admin_user_id=request.admin_user.id
+        )
+        
+        log_admin_action('create_job', 'job', job.id, f'Type: {job_type}')
+        
+        return jsonify({'job': job.to_dict()}), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Create job error: {e}")
+        return jsonify({'error': 'Failed to queue job'}), 500
+
+@admin_bp.route('/jobs', methods=['GET'])
+@admin_required
+def get_jobs():
+    """List background jobs with pagination"""
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        status = request.args.get('status', '')
+        
+        query = Job.query
+        if status:
+            query = query.filter(Job.status == status)
+        jobs = query.order_by(Job.id.desc()).paginate(
+            page=page,
+            per_page=per_page,
+            error_out=False
+        )
+        
+        return jsonify({
+            'jobs': [job.to_dict() for job in jobs.items],
+            'total': jobs.total,
+            'pages': jobs.pages,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
+        
+    except Exception as e:
+        logging.error(f"Get jobs error: {e}")
+        return jsonify({'error': 'Failed to retrieve jobs'}), 500
+
+@admin_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@admin_required
+def get_job(job_id):
+    """Get status and progress of a background job"""
+    try:
+        job = Job.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'job': job.to_dict()}), 200
+    except Exception as e:
+        logging.error(f"Get job error: {e}")
+        return jsonify({'error': 'Failed to retrieve job'}), 500
+
+@admin_bp.route('/jobs/<int:job_id>/download', methods=['GET'])
+@admin_required
+def download_job_result(job_id):
+    """Download the file produced by a finished export job"""
+    try:
+        job = Job.query.get(job_id)
+        result = (job.to_dict()['result'] if job else None) or {}
+        if not job or job.status != 'succeeded' or not result.get('file'):
+            return jsonify({'error': 'Job has no file to download'}), 404
+        
+        log_admin_action('download_job_result', 'job', job_id)
+        
+        return send_file(result['file'], as_attachment=True)
+    except Exception as e:
+        logging.error(f"Download job result error: {e}")
+        return jsonify({'error': 'Failed to download job result'}), 500
@@ -3,10 +3,14 @@ from flask import Blueprint, request, jsonify, session
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 from src.models.client import Client, db
+from src.utils.rate_limit import rate_limit
+from src.utils.profile_cache import profile_cache
+from src.utils.rollups import record_activity, record_login
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('client_register', ip_limit=(10, 600), account_field='email')
 def register():
     """Register a new client"""
     try:
@@ -33,6 +37,7 @@ def register():
         client.set_password(data['password'])
         
         db.session.add(client)
+        record_activity(signups=1)
         db.session.commit()
         
         # Log in the client
@@ -49,6 +54,7 @@ def register():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('client_login', account_field='email')
 def login():
     """Login a client"""
     try:
@@ -70,8 +76,11 @@ def login():
             return jsonify({'error': 'Account is deactivated'}), 401
         
         # Update last login
-        client.last_login = datetime.utcnow()
+        now = datetime.utcnow()
+        record_login(client, now)
+        client.last_login = now
         db.session.commit()
+        profile_cache.bump(client.id)
         
         # Set session
         session['client_id'] = client.id
@@ -102,11 +111,11 @@ def get_profile():
         if not client_id:
             return jsonify({'error': 'Not authenticated'}), 401
         
-        client = Client.query.get(client_id)
-        if not client:
+        profile = profile_cache.get(client_id)
+        if not profile:
             return jsonify({'error': 'Client not found'}), 404
         
-        return jsonify({'client': client.to_dict()})
+        return jsonify({'client': profile})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -134,6 +143,7 @@ def update_profile():
             client.phone = data['phone']
         
         db.session.commit()
+        profile_cache.bump(client_id)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -171,6 +181,7 @@ def change_password():
         
         client.set_password(new_password)
         db.session.commit()
+        profile_cache.bump(client_id)
         
         return jsonify({'message': 'Password changed successfully'})
         
@@ -190,3 +201,25 @@ def get_auth_status():
         'client_email': client_email
     })
 
+@auth_bp.route('/bootstrap', methods=['GET'])
+def bootstrap():
+    """Auth status, profile and Plaid connection status in one round trip"""
+    try:
+        client_id = session.get('client_id')
+        profile = profile_cache.get(client_id) if client_id else None
+        access_token = session.get('plaid_access_token')
+        
+        return jsonify({
+            'authenticated': bool(client_id),
+            'client_id': client_id,
+            'client_email': session.get('client_email'),
+            'client': profile,
+            'plaid': {
+                'connected': bool(access_token or (profile and profile['has_plaid_connection'])),
+                'access_token_exists': bool(access_token),
+                'item_count': profile['plaid_item_count'] if profile else 0
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,17 +1,72 @@
-import os
-from flask import Blueprint, request, jsonify, session
-from datetime import datetime, timedelta
+import uuid
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
+from datetime import date, datetime, timedelta
+from sqlalchemy import or_
+from src.models.user import db
+from src.models.plaid import PlaidItem
+from src.models.holding import Holding
+from src.models.transaction import InvestmentTransaction
+from src.models.job import Job
+from src.models.tax_lot import TaxLot, RealizedGain
+from src.utils.plaid_aggregation import (
+    fetch_items_concurrently,
+    merge_holdings,
+    merge_transactions,
+    merge_portfolio_summaries
+)
+from src.utils.plaid_sync import (
+    client_item_snapshots,
+    fetch_item_holdings,
+    fetch_item_portfolio_summary,
+    fetch_item_transactions,
+    mock_holdings,
+    mock_portfolio_summary,
+    mock_transactions,
+    sync_client_items
+)
+from src.utils.security_master import security_cache, securities_for
+from src.utils.profile_cache import profile_cache
+from src.utils.jobs import enqueue_job
+from src.utils.revaluation import apply_latest_prices
+from src.utils.statement_export import EXPORT_FORMATS, stream_statement
+from src.utils.tax_lots import apply_client, add_lot_selection, discard_transactions, gain_reports
 
 plaid_bp = Blueprint('plaid', __name__)
 
-# Plaid configuration - simplified for demo
-# In production, you would use actual Plaid credentials
-PLAID_CLIENT_ID = os.getenv('PLAID_CLIENT_ID', 'demo_client_id')
-PLAID_SECRET = os.getenv('PLAID_SECRET', 'demo_secret')
-PLAID_ENV = os.getenv('PLAID_ENV', 'sandbox')
+def get_client_items(client_id=None):
+    """Snapshot the linked items of a client (default: the logged-in client)"""
+    client_id = client_id or session.get('client_id')
+    if not client_id:
+        return []
+    return client_item_snapshots(client_id)
 
-# For demo purposes, we'll create mock responses
-# In production, you would configure the actual Plaid client
+def with_security_master(data, rows_key):
+    """Ship each referenced security's metadata once, from the master where known
+
+    Read-only; Plaid sync is what keeps the master up to date.
+    """
+    data['securities'] = securities_for(data.get(rows_key, []), data.get('securities', []))
+    return data
+
+def with_latest_prices(data):
+    """Value holdings at the latest end-of-day close instead of the fetched price"""
+    apply_latest_prices(data.get('holdings', []))
+    return data
+
+def aggregate(items, fetch, merge):
+    """Fetch all items concurrently and merge them into one payload"""
+    results, errors = fetch_items_concurrently(items, fetch)
+    data = merge(results)
+    data['items'] = [
+        {
+            'item_id': item['item_id'],
+            'institution_name': item['institution_name'],
+            'status': 'error' if item['item_id'] in errors else 'ok',
+            'error': errors.get(item['item_id'])
+        }
+        for item in items
+    ]
+    return data
 
 @plaid_bp.route('/create_link_token', methods=['POST'])
 def create_link_token():
@@ -38,13 +93,32 @@ def exchange_public_token():
         
         # For demo purposes, return mock access token
         # In production, you would exchange with Plaid API
-        session['plaid_access_token'] = 'demo_access_token_12345'
+        access_token = 'demo_access_token_12345'
+        item_id = 'demo_item_id_12345'
+        session['plaid_access_token'] = access_token
+        
+        # Persist the item so a client can link several institutions
+        client_id = session.get('client_id')
+        if client_id:
+            institution = (data.get('metadata') or {}).get('institution') or {}
+            item_id = f'demo_item_{uuid.uuid4().hex[:12]}'
+            item = PlaidItem(
+                client_id=client_id,
+                item_id=item_id,
+                access_token=access_token,
+                institution_id=institution.get('institution_id'),
+                institution_name=institution.get('name')
+            )
+            db.session.add(item)
+            db.session.commit()
+            profile_cache.bump(client_id)
         
         return jsonify({
-            'access_token': 'demo_access_token_12345',
-            'item_id': 'demo_item_id_12345'
+            'access_token': access_token,
+            'item_id': item_id
         })
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @plaid_bp.route('/status', methods=['GET'])
@@ -52,55 +126,106 @@ def get_connection_status():
     """Check if user has connected Plaid account"""
     try:
         access_token = session.get('plaid_access_token')
+        client_id = session.get('client_id')
+        profile = profile_cache.get(client_id) if client_id else None
         return jsonify({
-            'connected': bool(access_token),
-            'access_token_exists': bool(access_token)
+            'connected': bool(access_token or (profile and profile['has_plaid_connection'])),
+            'access_token_exists': bool(access_token),
+            'item_count': profile['plaid_item_count'] if profile else 0
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@plaid_bp.route('/items', methods=['GET'])
+def get_items():
+    """List the institutions linked by the current client"""
+    try:
+        client_id = session.get('client_id')
+        if not client_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        items = PlaidItem.query.filter_by(client_id=client_id).order_by(PlaidItem.id).all()
+        return jsonify({'items': [item.to_dict() for item in items]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@plaid_bp.route('/items/<int:item_id>', methods=['DELETE'])
+def remove_item(item_id):
+    """Unlink a single institution"""
+    try:
+        client_id = session.get('client_id')
+        if not client_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        item = PlaidItem.query.filter_by(id=item_id, client_id=client_id).first()
+        if not item:
+            return jsonify({'error': 'Item not found'}), 404
+        
+        Holding.query.filter_by(plaid_item_id=item.id).delete(synchronize_session=False)
+        # Relinking refetches the full history, so the item's transactions go
+        # with it (along with rows orphaned by earlier unlinks)
+        discard_transactions(client_id, or_(
+            InvestmentTransaction.plaid_item_id == item.id,
+            InvestmentTransaction.plaid_item_id.is_(None)
+        ))
+        db.session.delete(item)
+        db.session.commit()
+        apply_client(client_id)
+        profile_cache.bump(client_id)
+        return jsonify({'message': 'Institution unlinked successfully'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@plaid_bp.route('/items/sync', methods=['POST'])
+def sync_items():
+    """Refresh every linked institution concurrently
+
+    Pass ?async=1 to run the sync on the job queue and get a job ID back.
+    """
+    try:
+        client_id = session.get('client_id')
+        if not client_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        if request.args.get('async', type=int):
+            job = enqueue_job('plaid_sync', {'client_id': client_id}, priority=5, client_id=client_id)
+            return jsonify({'job': job.to_dict()}), 202
+        
+        return jsonify(sync_client_items(client_id))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@plaid_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Progress of a background job started by the current client"""
+    try:
+        client_id = session.get('client_id')
+        if not client_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        job = Job.query.filter_by(id=job_id, client_id=client_id).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({'job': job.to_dict()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @plaid_bp.route('/portfolio_summary', methods=['GET'])
 def get_portfolio_summary():
     """Get portfolio summary data"""
     try:
+        items = get_client_items()
+        if items:
+            return jsonify(aggregate(items, fetch_item_portfolio_summary, merge_portfolio_summaries))
+        
         access_token = session.get('plaid_access_token')
         if not access_token:
             return jsonify({'error': 'No connected account found'}), 400
         
-        # Mock portfolio data for demo
-        mock_data = {
-            'total_value': 125750.50,
-            'account_balances': {
-                'acc_001': {
-                    'name': 'Investment Account',
-                    'balance': 85250.25
-                },
-                'acc_002': {
-                    'name': 'Retirement Account',
-                    'balance': 40500.25
-                }
-            },
-            'asset_allocation': {
-                'stocks': {
-                    'value': 75450.30,
-                    'percentage': 60.0
-                },
-                'bonds': {
-                    'value': 25150.10,
-                    'percentage': 20.0
-                },
-                'cash': {
-                    'value': 12575.05,
-                    'percentage': 10.0
-                },
-                'other': {
-                    'value': 12575.05,
-                    'percentage': 10.0
-                }
-            }
-        }
-        
-        return jsonify(mock_data)
+        return jsonify(mock_portfolio_summary())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -108,75 +233,18 @@ def get_portfolio_summary():
 def get_holdings():
     """Get investment holdings"""
     try:
+        items = get_client_items()
+        if items:
+            return jsonify(with_latest_prices(with_security_master(
+                aggregate(items, fetch_item_holdings, merge_holdings),
+                'holdings'
+            )))
+        
         access_token = session.get('plaid_access_token')
         if not access_token:
             return jsonify({'error': 'No connected account found'}), 400
         
-        # Mock holdings data for demo
-        mock_data = {
-            'accounts': [
-                {
-                    'account_id': 'acc_001',
-                    'name': 'Investment Account',
-                    'type': 'investment',
-                    'subtype': 'brokerage'
-                },
-                {
-                    'account_id': 'acc_002',
-                    'name': 'Retirement Account',
-                    'type': 'investment',
-                    'subtype': '401k'
-                }
-            ],
-            'holdings': [
-                {
-                    'account_id': 'acc_001',
-                    'security_id': 'sec_001',
-                    'quantity': 100,
-                    'institution_price': 150.25,
-                    'institution_value': 15025.00,
-                    'cost_basis': 140.00
-                },
-                {
-                    'account_id': 'acc_001',
-                    'security_id': 'sec_002',
-                    'quantity': 50,
-                    'institution_price': 85.50,
-                    'institution_value': 4275.00,
-                    'cost_basis': 80.00
-                },
-                {
-                    'account_id': 'acc_002',
-                    'security_id': 'sec_003',
-                    'quantity': 200,
-                    'institution_price': 45.75,
-                    'institution_value': 9150.00,
-                    'cost_basis': 42.00
-                }
-            ],
-            'securities': [
-                {
-                    'security_id': 'sec_001',
-                    'name': 'Apple Inc.',
-                    'ticker_symbol': 'AAPL',
-                    'type': 'equity'
-                },
-                {
-                    'security_id': 'sec_002',
-                    'name': 'Microsoft Corporation',
-                    'ticker_symbol': 'MSFT',
-                    'type': 'equity'
-                },
-                {
-                    'security_id': 'sec_003',
-                    'name': 'Vanguard S&P 500 ETF',
-                    'ticker_symbol': 'VOO',
-                    'type': 'etf'
-                }
-            ]
-        }
-        
-        return jsonify(mock_data)
+        return jsonify(with_latest_prices(with_security_master(mock_holdings(), 'holdings')))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -184,78 +252,131 @@ def get_holdings():
 def get_transactions():
     """Get investment transactions"""
     try:
+        # Get date range from query parameters
+        start_date = request.args.get('start_date', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
+        end_date = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+        
+        items = get_client_items()
+        if items:
+            return jsonify(with_security_master(
+                aggregate(items, fetch_item_transactions, merge_transactions),
+                'transactions'
+            ))
+        
         access_token = session.get('plaid_access_token')
         if not access_token:
             return jsonify({'error': 'No connected account found'}), 400
         
-        # Get date range from query parameters
-        start_date = request.args.get('start_date', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-        end_date = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+        return jsonify(with_security_master(mock_transactions(), 'transactions'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@plaid_bp.route('/transactions/export', methods=['GET'])
+def export_transactions():
+    """Stream the client's stored transaction history as CSV, OFX or QFX"""
+    try:
+        client_id = session.get('client_id')
+        if not client_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'format must be one of {", ".join(EXPORT_FORMATS)}'}), 400
+        
+        try:
+            start_date = request.args.get('start_date')
+            end_date = request.args.get('end_date')
+            start_date = date.fromisoformat(start_date) if start_date else None
+            end_date = date.fromisoformat(end_date) if end_date else None
+        except ValueError:
+            return jsonify({'error': 'Dates must be formatted YYYY-MM-DD'}), 400
+        
+        mimetypes = {'csv': 'text/csv', 'ofx': 'application/x-ofx', 'qfx': 'application/vnd.intu.qfx'}
+        return Response(
+            stream_with_context(stream_statement(client_id, export_format, start_date, end_date)),
+            mimetype=mimetypes[export_format],
+            headers={'Content-Disposition': f'attachment; filename=transactions.{export_format}'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@plaid_bp.route('/tax-lots', methods=['GET'])
+def get_tax_lots():
+    """Open tax lots and unrealized gains, as of the last sync"""
+    try:
+        client_id = session.get('client_id')
+        if not client_id:
+            return jsonify({'error': 'Not authenticated'}), 401
         
-        # Mock transaction data for demo
-        mock_data = {
-            'transactions': [
-                {
-                    'account_id': 'acc_001',
-                    'security_id': 'sec_001',
-                    'date': '2025-01-15',
-                    'name': 'Apple Inc.',
-                    'type': 'buy',
-                    'subtype': 'buy',
-                    'quantity': 10,
-                    'price': 150.25,
-                    'amount': 1502.50,
-                    'fees': 0.00
-                },
-                {
-                    'account_id': 'acc_001',
-                    'security_id': 'sec_002',
-                    'date': '2025-01-10',
-                    'name': 'Microsoft Corporation',
-                    'type': 'buy',
-                    'subtype': 'buy',
-                    'quantity': 25,
-                    'price': 85.50,
-                    'amount': 2137.50,
-                    'fees': 0.00
-                },
-                {
-                    'account_id': 'acc_002',
-                    'security_id': 'sec_003',
-                    'date': '2025-01-05',
-                    'name': 'Vanguard S&P 500 ETF',
-                    'type': 'buy',
-                    'subtype': 'buy',
-                    'quantity': 50,
-                    'price': 45.75,
-                    'amount': 2287.50,
-                    'fees': 0.00
-                }
+        lots = TaxLot.query.filter_by(client_id=client_id, is_open=True).order_by(
+            TaxLot.account_id, TaxLot.security_id, TaxLot.acquired_date, TaxLot.id
+        ).all()
+        securities = security_cache.get_many({lot.security_id for lot in lots})
+        reports = gain_reports(client_id=client_id)
+        return jsonify({
+            'tax_lots': [
+                dict(lot.to_dict(), ticker_symbol=(securities.get(lot.security_id) or {}).get('ticker_symbol'))
+                for lot in lots
             ],
-            'securities': [
-                {
-                    'security_id': 'sec_001',
-                    'name': 'Apple Inc.',
-                    'ticker_symbol': 'AAPL',
-                    'type': 'equity'
-                },
-                {
-                    'security_id': 'sec_002',
-                    'name': 'Microsoft Corporation',
-                    'ticker_symbol': 'MSFT',
-                    'type': 'equity'
-                },
-                {
-                    'security_id': 'sec_003',
-                    'name': 'Vanguard S&P 500 ETF',
-                    'ticker_symbol': 'VOO',
-                    'type': 'etf'
-                }
-            ]
-        }
+            'unrealized': reports[0]['unrealized'] if reports else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@plaid_bp.route('/realized-gains', methods=['GET'])
+def get_realized_gains():
+    """Realized gains matched against tax lots, optionally for one tax year"""
+    try:
+        client_id = session.get('client_id')
+        if not client_id:
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        year = request.args.get('year', type=int)
+        query = RealizedGain.query.filter_by(client_id=client_id)
+        if year:
+            query = query.filter(
+                RealizedGain.sold_date >= date(year, 1, 1),
+                RealizedGain.sold_date <= date(year, 12, 31)
+            )
+        gains = query.order_by(RealizedGain.sold_date, RealizedGain.id).all()
+        reports = gain_reports(year, client_id)
+        return jsonify({
+            'realized_gains': [gain.to_dict() for gain in gains],
+            'totals': reports[0]['realized'] if reports else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@plaid_bp.route('/tax-lots/selections', methods=['POST'])
+def select_tax_lot():
+    """Specific-ID: match part of a sell against a chosen lot instead of FIFO"""
+    try:
+        client_id = session.get('client_id')
+        if not client_id:
+            return jsonify({'error': 'Not authenticated'}), 401
         
-        return jsonify(mock_data)
+        data = request.get_json() or {}
+        try:
+            sell_transaction_id = int(data['sell_transaction_id'])
+            open_transaction_id = int(data['open_transaction_id'])
+            quantity = float(data['quantity'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'sell_transaction_id, open_transaction_id and quantity are required'}), 400
+        
+        try:
+            add_lot_selection(client_id, sell_transaction_id, open_transaction_id, quantity)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        
+        gains = RealizedGain.query.filter_by(
+            client_id=client_id, sell_transaction_id=sell_transaction_id
+        ).order_by(RealizedGain.id).all()
+        return jsonify({'realized_gains': [gain.to_dict() for gain in gains]}), 201
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @plaid_bp.route('/disconnect', methods=['POST'])
@@ -265,7 +386,16 @@ def disconnect_account():
         # Remove access token from session
         session.pop('plaid_access_token', None)
         
+        # Unlink every institution of the current client
+        client_id = session.get('client_id')
+        if client_id:
+            Holding.query.filter_by(client_id=client_id).delete(synchronize_session=False)
+            discard_transactions(client_id)
+            PlaidItem.query.filter_by(client_id=client_id).delete(synchronize_session=False)
+            db.session.commit()
+            profile_cache.bump(client_id)
+        
         return jsonify({'message': 'Account disconnected successfully'})
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
-
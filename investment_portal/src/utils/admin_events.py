@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from sqlalchemy import or_
+from src.models.admin import AuditLog
+from src.models.user import db
+
+# Server-Sent Events configuration for the admin dashboard
+ADMIN_STREAM_INTERVAL = float(os.getenv('ADMIN_STREAM_INTERVAL', '5'))
+ADMIN_STREAM_HEARTBEAT = float(os.getenv('ADMIN_STREAM_HEARTBEAT', '15'))
+ADMIN_STREAM_REPLAY_SIZE = int(os.getenv('ADMIN_STREAM_REPLAY_SIZE', '1000'))
+# Audit IDs are allocated before commit, so a row can appear behind ones already streamed
+AUDIT_RESCAN_WINDOW = int(os.getenv('AUDIT_RESCAN_WINDOW', '100'))
+SUBSCRIBER_QUEUE_SIZE = 500
+AUDIT_BATCH_SIZE = 200
+
+
+def format_event(event_id, event_type, data):
+    """Encode one SSE message"""
+    return f'id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+
+def parse_event_id(value):
+    """Audit cursor from a Last-Event-ID header, or None if malformed"""
+    try:
+        event_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return event_id if event_id >= 0 else None
+
+
+class DashboardPublisher:
+    """Single background query loop fanning dashboard events out to every stream
+
+    However many admins are connected, stats and new audit rows are queried
+    once per interval. Every event ID is the highest audit log ID streamed so
+    far, so a reconnecting client resumes from Last-Event-ID by reading the
+    audit table from that row on, even across restarts.
+    """
+
+    def __init__(self, stats_fn, interval=ADMIN_STREAM_INTERVAL):
+        self.stats_fn = stats_fn
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._stats = None
+        # Highest audit ID streamed, rows at or below the floor are never rescanned,
+        # and IDs streamed inside the rescan window are remembered to skip repeats
+        self._last_audit_id = None
+        self._audit_floor = 0
+        self._seen_audit_ids = set()
+        self._thread = None
+
+    def subscribe(self, app, last_event_id=None):
+        """Register a stream; return its queue pre-filled with missed rows and a snapshot"""
+        subscriber = queue.Queue(maxsize=ADMIN_STREAM_REPLAY_SIZE + SUBSCRIBER_QUEUE_SIZE)
+        resume_id = parse_event_id(last_event_id)
+        if resume_id is not None and resume_id > (db.session.query(db.func.max(AuditLog.id)).scalar() or 0):
+            resume_id = None
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._last_audit_id is None:
+                # Feed not positioned yet: start it at the client's position
+                self._last_audit_id = resume_id
+                self._audit_floor = resume_id or 0
+                self._seen_audit_ids = set()
+            elif resume_id is not None and resume_id < self._last_audit_id:
+                for log in self._missed_audit_logs(resume_id):
+                    subscriber.put_nowait((log['id'], 'audit_log', log))
+            if self._stats is not None:
+                subscriber.put_nowait((self._last_audit_id, 'stats', self._stats))
+            self._subscribers.add(subscriber)
+            self._ensure_running(app)
+        return subscriber
+
+    def _missed_audit_logs(self, resume_id):
+        """Rows already streamed since resume_id, oldest first; empty if too far behind
+
+        Called with the lock held so nothing is published in between. Rows in
+        the rescan window the feed has not streamed yet are left to the feed.
+        """
+        floor = self._last_audit_id - AUDIT_RESCAN_WINDOW
+        streamed = AuditLog.id <= floor
+        if self._seen_audit_ids:
+            streamed = or_(streamed, AuditLog.id.in_(self._seen_audit_ids))
+        logs = AuditLog.query.options(db.joinedload(AuditLog.admin_user)).filter(
+            AuditLog.id > resume_id,
+            AuditLog.id <= self._last_audit_id,
+            streamed
+        ).order_by(AuditLog.id).limit(ADMIN_STREAM_REPLAY_SIZE + 1).all()
+        if len(logs) > ADMIN_STREAM_REPLAY_SIZE:
+            return []
+        return [log.to_dict() for log in logs]
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stream(self, subscriber):
+        """Generator of SSE text for one subscriber, with heartbeats"""
+        try:
+            yield f'retry: {int(self.interval * 1000)}\n\n'
+            while True:
+                try:
+                    event_id, event_type, data = subscriber.get(timeout=ADMIN_STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                if event_type == 'close':
+                    return
+                yield format_event(event_id, event_type, data)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _ensure_running(self, app):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, args=(app,), name='admin-dashboard-publisher', daemon=True)
+            self._thread.start()
+
+    def _publish(self, event_type, data, audit_id=None):
+        with self._lock:
+            if audit_id is not None:
+                self._seen_audit_ids.add(audit_id)
+                self._last_audit_id = max(self._last_audit_id, audit_id)
+            event = (self._last_audit_id, event_type, data)
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # Slow consumer: drop it, the browser reconnects with Last-Event-ID
+                    self._subscribers.discard(subscriber)
+                    try:
+                        subscriber.get_nowait()
+                        subscriber.put_nowait((event[0], 'close', None))
+                    except (queue.Empty, queue.Full):
+                        pass
+
+    def _poll(self):
+        """Run one query cycle and publish stats deltas and new audit rows"""
+        if self._last_audit_id is None:
+            # Fresh clients only get rows written after they connected
+            latest = db.session.query(db.func.max(AuditLog.id)).scalar() or 0
+            with self._lock:
+                if self._last_audit_id is None:
+                    self._last_audit_id = self._audit_floor = latest
+
+        stats = self.stats_fn()
+        previous = self._stats
+        with self._lock:
+            self._stats = stats
+        if previous is None:
+            self._publish('stats', stats)
+        else:
+            delta = {key: value for key, value in stats.items() if previous.get(key) != value}
+            if delta:
+                self._publish('stats_delta', delta)
+
+        # Rescan a window behind the cursor to pick up rows that committed late
+        with self._lock:
+            floor = max(self._audit_floor, self._last_audit_id - AUDIT_RESCAN_WINDOW)
+            seen = set(self._seen_audit_ids)
+        query = AuditLog.query.options(db.joinedload(AuditLog.admin_user)).filter(AuditLog.id > floor)
+        if seen:
+            query = query.filter(AuditLog.id.notin_(seen))
+        for log in query.order_by(AuditLog.id).limit(AUDIT_BATCH_SIZE).all():
+            self._publish('audit_log', log.to_dict(), audit_id=log.id)
+
+        with self._lock:
+            floor = max(self._audit_floor, self._last_audit_id - AUDIT_RESCAN_WINDOW)
+            self._seen_audit_ids = {audit_id for audit_id in self._seen_audit_ids if audit_id > floor}
+
+    def _run(self, app):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Idle until the next stream connects, which sets the audit cursor
+                    self._thread = None
+                    self._stats = None
+                    return
+            with app.app_context():
+                try:
+                    self._poll()
+                except Exception as e:
+                    logging.error(f"Dashboard publisher error: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(self.interval)
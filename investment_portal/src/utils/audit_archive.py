@@ -0,0 +1,240 @@
+import os
+import glob
+import gzip
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from src.models.admin import AuditLog
+from src.models.user import db
+
+# Retention configuration for the audit trail
+AUDIT_RETENTION_MONTHS = int(os.getenv('AUDIT_RETENTION_MONTHS', '6'))
+AUDIT_ARCHIVE_DIR = os.getenv(
+    'AUDIT_ARCHIVE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'audit_archive')
+)
+ARCHIVE_BATCH_SIZE = 1000
+
+audit_table = AuditLog.__table__
+
+
+def month_start(value):
+    """First instant of the month containing value"""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    """Shift a month start by count months"""
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'audit_logs_{month.year:04d}_{month.month:02d}'
+
+
+def archive_path(month):
+    return os.path.join(AUDIT_ARCHIVE_DIR, f'{partition_name(month)}.jsonl.gz')
+
+
+def is_partitioned():
+    """True when audit_logs is a native PostgreSQL range-partitioned table"""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'audit_logs'"
+    )).first() is not None
+
+
+def create_month_partition(month):
+    """Create the monthly partition covering month if it does not exist
+
+    Rows for the month that already landed in audit_logs_default are moved
+    into the new table before it is attached, since PostgreSQL refuses to
+    attach a range the default partition still holds rows for.
+    """
+    name = partition_name(month)
+    if db.session.execute(text('SELECT to_regclass(:name)'), {'name': name}).scalar():
+        return
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    for statement in (
+        f'CREATE TABLE {name} (LIKE audit_logs INCLUDING DEFAULTS)',
+        f'WITH moved AS (DELETE FROM audit_logs_default WHERE "timestamp" >= \'{start}\' '
+        f'AND "timestamp" < \'{end}\' RETURNING *) INSERT INTO {name} SELECT * FROM moved',
+        f"ALTER TABLE audit_logs ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')",
+    ):
+        db.session.execute(text(statement))
+
+
+def ensure_audit_partitions(months_ahead=3):
+    """Pre-create partitions for the current and upcoming months
+
+    Called at startup and from every archive run, so long-lived processes keep
+    partitions ahead of the clock. No-op on SQLite or an unpartitioned table,
+    where retention falls back to range deletes on the timestamp index.
+    """
+    if not is_partitioned():
+        return
+    current = month_start(datetime.utcnow())
+    for offset in range(months_ahead + 1):
+        create_month_partition(add_months(current, offset))
+    db.session.commit()
+
+
+def partition_audit_logs(months_ahead=3):
+    """One-off PostgreSQL migration of audit_logs to monthly range partitions"""
+    if db.engine.dialect.name != 'postgresql':
+        raise RuntimeError('Native partitioning requires PostgreSQL')
+    if is_partitioned():
+        return False
+
+    oldest = db.session.execute(text('SELECT MIN("timestamp") FROM audit_logs')).scalar()
+    columns = ', '.join(f'"{column.name}"' for column in audit_table.columns)
+    select_columns = columns.replace('"timestamp"', 'COALESCE("timestamp", now() at time zone \'utc\')')
+
+    for statement in (
+        'ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned',
+        'ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey',
+        'CREATE TABLE audit_logs (LIKE audit_logs_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")',
+        'ALTER TABLE audit_logs ALTER COLUMN "timestamp" SET NOT NULL',
+        'ALTER TABLE audit_logs ADD PRIMARY KEY (id, "timestamp")',
+        'ALTER TABLE audit_logs ADD FOREIGN KEY (admin_user_id) REFERENCES admin_users (id)',
+        'ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id',
+        'CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT',
+    ):
+        db.session.execute(text(statement))
+
+    month = month_start(oldest or datetime.utcnow())
+    last = add_months(month_start(datetime.utcnow()), months_ahead)
+    while month <= last:
+        create_month_partition(month)
+        month = add_months(month, 1)
+
+    db.session.execute(text(
+        f'INSERT INTO audit_logs ({columns}) SELECT {select_columns} FROM audit_logs_unpartitioned'
+    ))
+    db.session.execute(text('DROP TABLE audit_logs_unpartitioned'))
+    db.session.commit()
+    return True
+
+
+def serialize_row(row):
+    """Plain JSON-friendly dict for an audit_logs row"""
+    data = dict(row)
+    if data.get('timestamp'):
+        data['timestamp'] = data['timestamp'].isoformat()
+    return data
+
+
+def archive_month(month):
+    """Write one month of audit logs to compressed JSONL and drop it from the hot table
+
+    The month's archive is rewritten as the union of what it already holds and
+    the hot rows, keyed by ID, and replaced before the rows are dropped. A run
+    that fails after the rename leaves the rows in both places, and the retry
+    rewrites the same archive instead of appending duplicates.
+    """
+    start, end = month, add_months(month, 1)
+    os.makedirs(AUDIT_ARCHIVE_DIR, exist_ok=True)
+    path = archive_path(month)
+    temp_path = f'{path}.tmp'
+
+    query = audit_table.select().where(
+        audit_table.c.timestamp >= start,
+        audit_table.c.timestamp < end
+    ).order_by(audit_table.c.id).execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+
+    archived_ids = set()
+    count = 0
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as archive:
+        if os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as existing:
+                for line in existing:
+                    row_id = json.loads(line)['id']
+                    if row_id not in archived_ids:
+                        archived_ids.add(row_id)
+                        archive.write(line)
+        for row in db.session.execute(query).mappings():
+            count += 1
+            if row['id'] not in archived_ids:
+                archive.write(json.dumps(serialize_row(row)) + '\n')
+
+    if not count:
+        os.remove(temp_path)
+        return 0
+    os.replace(temp_path, path)
+
+    name = partition_name(month)
+    if is_partitioned() and db.session.execute(
+        text('SELECT to_regclass(:name)'), {'name': name}
+    ).scalar():
+        db.session.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION {name}'))
+        db.session.execute(text(f'DROP TABLE {name}'))
+    else:
+        db.session.execute(audit_table.delete().where(
+            audit_table.c.timestamp >= start,
+            audit_table.c.timestamp < end
+        ))
+    db.session.commit()
+
+    logging.info(f"Archived {count} audit logs for {name} to {path}")
+    return count
+
+
+def archive_audit_logs(retention_months=AUDIT_RETENTION_MONTHS, now=None, progress=None):
+    """Archive every month older than the retention window; return rows moved per month"""
+    ensure_audit_partitions()
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retention_months)
+    oldest = db.session.query(db.func.min(AuditLog.timestamp)).scalar()
+    if oldest is None:
+        return {}
+
+    months = []
+    month = month_start(oldest)
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+
+    archived = {}
+    for index, month in enumerate(months):
+        if progress:
+            progress(100.0 * index / len(months), f'Archiving {partition_name(month)}')
+        count = archive_month(month)
+        if count:
+            archived[partition_name(month)] = count
+    return archived
+
+
+def iter_archived_logs(start=None, end=None):
+    """Yield archived audit rows between start and end, oldest month first"""
+    for path in sorted(glob.glob(os.path.join(AUDIT_ARCHIVE_DIR, 'audit_logs_*.jsonl.gz'))):
+        year, month = os.path.basename(path)[len('audit_logs_'):-len('.jsonl.gz')].split('_')
+        first = datetime(int(year), int(month), 1)
+        if (end and first >= end) or (start and add_months(first, 1) <= start):
+            continue
+
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                row = json.loads(line)
+                timestamp = datetime.fromisoformat(row['timestamp']) if row.get('timestamp') else None
+                if timestamp and ((start and timestamp < start) or (end and timestamp >= end)):
+                    continue
+                yield row
+
+
+def iter_audit_logs(start=None, end=None):
+    """Yield audit rows from the archive followed by the hot table"""
+    yield from iter_archived_logs(start, end)
+
+    query = audit_table.select()
+    if start:
+        query = query.where(audit_table.c.timestamp >= start)
+    if end:
+        query = query.where(audit_table.c.timestamp < end)
+    query = query.order_by(audit_table.c.timestamp, audit_table.c.id)
+
+    for row in db.session.execute(query.execution_options(yield_per=ARCHIVE_BATCH_SIZE)).mappings():
+        yield serialize_row(row)
@@ -0,0 +1,118 @@
+import math
+from sqlalchemy import and_, case, exists, func, select
+from sqlalchemy.orm import selectinload
+from src.models.client import Client
+from src.models.plaid import PlaidItem
+from src.models.user import db
+
+# Columns rendered by the admin client table; derived flags are computed in SQL
+LISTING_COLUMNS = (
+    Client.id,
+    Client.email,
+    Client.first_name,
+    Client.last_name,
+    Client.phone,
+    Client.is_active,
+    Client.created_at,
+    Client.last_login,
+    Client.plaid_connected_at,
+)
+DATETIME_FIELDS = ('created_at', 'last_login', 'plaid_connected_at')
+
+
+def client_filter_criteria(search='', status=''):
+    """Build SQL criteria for the client search/status filters"""
+    criteria = []
+
+    # Apply search filter
+    if search:
+        criteria.append(
+            db.or_(
+                Client.first_name.ilike(f'%{search}%'),
+                Client.last_name.ilike(f'%{search}%'),
+                Client.email.ilike(f'%{search}%')
+            )
+        )
+
+    # Apply status filter
+    if status:
+        is_active = status.lower() == 'active'
+        criteria.append(Client.is_active == is_active)
+
+    return criteria
+
+
+def listing_query(criteria):
+    """Column-projected select for the client table, newest first"""
+    item_count = (
+        select(func.count(PlaidItem.id))
+        .where(PlaidItem.client_id == Client.id)
+        .correlate(Client)
+        .scalar_subquery()
+    )
+    has_items = exists().where(PlaidItem.client_id == Client.id)
+    has_plaid_connection = case(
+        (and_(Client.plaid_access_token.isnot(None), Client.plaid_item_id.isnot(None)), True),
+        (has_items, True),
+        else_=False
+    )
+    return (
+        select(
+            *LISTING_COLUMNS,
+            has_plaid_connection.label('has_plaid_connection'),
+            item_count.label('plaid_item_count')
+        )
+        .where(*criteria)
+        .order_by(Client.created_at.desc(), Client.id.desc())
+    )
+
+
+def serialize_row(row):
+    """Row mapping to the same shape as Client.to_dict()"""
+    data = dict(row)
+    for field in DATETIME_FIELDS:
+        if data[field] is not None:
+            data[field] = data[field].isoformat()
+    data['is_active'] = bool(data['is_active']) if data['is_active'] is not None else None
+    data['has_plaid_connection'] = bool(data['has_plaid_connection'])
+    return data
+
+
+def fetch_client_page(search='', status='', page=1, per_page=20):
+    """One page of clients as plain dicts, without materialising ORM objects"""
+    page = max(page, 1)
+    per_page = per_page if per_page > 0 else 20
+    criteria = client_filter_criteria(search, status)
+
+    total = db.session.execute(select(func.count(Client.id)).where(*criteria)).scalar()
+    rows = db.session.execute(
+        listing_query(criteria).limit(per_page).offset((page - 1) * per_page)
+    ).mappings()
+
+    return {
+        'clients': [serialize_row(row) for row in rows],
+        'total': total,
+        'pages': math.ceil(total / per_page) if total else 0,
+        'current_page': page,
+        'per_page': per_page
+    }
+
+
+def fetch_client_page_orm(search='', status='', page=1, per_page=20):
+    """Previous ORM read path, kept as the benchmark baseline
+
+    Items are loaded for the whole page in one query, so to_dict() does not
+    issue a query per client.
+    """
+    clients = Client.query.options(selectinload(Client.plaid_items)).filter(*client_filter_criteria(search, status)).order_by(
+        Client.created_at.desc(),
+        Client.id.desc()
+    ).paginate(page=page, per_page=per_page, error_out=False)
+
+    return {
+        'clients': [client.to_dict() for client in clients.items],
+        'total': clients.total,
+        'pages': clients.pages,
+        'current_page': page,
+        'per_page': per_page
+    }
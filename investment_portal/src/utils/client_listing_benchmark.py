@@ -0,0 +1,86 @@
+"""Benchmark the admin client listing: column-projected path vs ORM path
+
+Seeds a scratch database and times both read paths at per_page=500. Uses
+QUERY_PLAN_DATABASE_URL, which create_plan_app refuses unless it is safe to
+drop (see src.utils.query_plans).
+
+Usage (from the investment_portal directory):
+    python -m src.utils.client_listing_benchmark [--clients 5000] [--rounds 20]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from src.models.client import Client
+from src.models.plaid import PlaidItem
+from src.models.user import db
+from src.utils.client_listing import fetch_client_page, fetch_client_page_orm
+from src.utils.query_plans import create_plan_app
+
+
+def seed_clients(count):
+    """Bulk insert count clients, a third of them with linked items"""
+    now = datetime.utcnow()
+    db.session.execute(Client.__table__.insert(), [
+        {
+            'email': f'bench{index}@example.com',
+            'password_hash': 'not-a-real-hash',
+            'first_name': 'Bench',
+            'last_name': str(index),
+            'phone': '555-0100',
+            'is_active': index % 5 != 0,
+            'created_at': now - timedelta(minutes=index),
+            'last_login': now - timedelta(hours=random.randint(0, 1000))
+        }
+        for index in range(count)
+    ])
+    client_ids = [client_id for (client_id,) in db.session.query(Client.id)]
+    db.session.execute(PlaidItem.__table__.insert(), [
+        {
+            'client_id': client_id,
+            'item_id': f'bench_item_{client_id}',
+            'access_token': 'bench-token',
+            'created_at': now
+        }
+        for client_id in client_ids[::3]
+    ])
+    db.session.commit()
+
+
+def time_path(fetch, rounds, per_page):
+    """Return rows/sec for fetch over rounds full pages"""
+    rows = 0
+    started = time.perf_counter()
+    for round_index in range(rounds):
+        rows += len(fetch(page=round_index % 5 + 1, per_page=per_page)['clients'])
+        db.session.expunge_all()
+    return rows / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--per-page', type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_plan_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_clients(args.clients)
+
+        # Warm up both paths before timing
+        fetch_client_page(per_page=args.per_page)
+        fetch_client_page_orm(per_page=args.per_page)
+
+        orm_rate = time_path(fetch_client_page_orm, args.rounds, args.per_page)
+        fast_rate = time_path(fetch_client_page, args.rounds, args.per_page)
+        db.drop_all()
+
+    print(f'ORM path:       {orm_rate:,.0f} rows/sec')
+    print(f'Projected path: {fast_rate:,.0f} rows/sec ({fast_rate / orm_rate:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
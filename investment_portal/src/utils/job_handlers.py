@@ -0,0 +1,84 @@
+import os
+import gzip
+import json
+from datetime import date, datetime
+from src.utils.jobs import job_handler
+from src.utils.audit_archive import AUDIT_ARCHIVE_DIR, archive_audit_logs, iter_audit_logs
+from src.utils.revaluation import resolve_price_file, run_revaluation
+from src.utils.tax_lots import apply_all_clients, gain_reports
+from src.utils.plaid_sync import sync_client_items
+
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(os.path.dirname(AUDIT_ARCHIVE_DIR), 'exports'))
+EXPORT_PROGRESS_EVERY = 10000
+
+
+@job_handler('plaid_sync')
+def plaid_sync_job(payload, job):
+    """Sync every linked institution of one client"""
+    job.progress(0, 'Fetching linked institutions')
+    return sync_client_items(payload['client_id'], progress=job.progress)
+
+
+@job_handler('revalue_holdings')
+def revalue_holdings_job(payload, job):
+    """Revalue the whole book from an end-of-day price file"""
+    job.progress(0, f"Loading {os.path.basename(payload['price_file'])}")
+    price_date = date.fromisoformat(payload['price_date']) if payload.get('price_date') else None
+    return run_revaluation(resolve_price_file(payload['price_file']), price_date, progress=job.progress)
+
+
+@job_handler('archive_audit_logs')
+def archive_audit_logs_job(payload, job):
+    """Move audit logs past the retention window into compressed archives"""
+    job.progress(0, 'Archiving expired months')
+    return {'archived': archive_audit_logs(progress=job.progress)}
+
+
+@job_handler('export_audit_logs')
+def export_audit_logs_job(payload, job):
+    """Write audit logs (archived and hot) to a compressed JSONL file"""
+    start = datetime.fromisoformat(payload['start_date']) if payload.get('start_date') else None
+    end = datetime.fromisoformat(payload['end_date']) if payload.get('end_date') else None
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f'audit_logs_export_{job.job_id}.jsonl.gz')
+    count = 0
+    # Rows arrive in timestamp order and the total is unknown up front, so
+    # progress is the fraction of the time range covered so far
+    upper = end or datetime.utcnow()
+    lower = start
+    with gzip.open(path, 'wt', encoding='utf-8') as export:
+        for row in iter_audit_logs(start, end):
+            export.write(json.dumps(row) + '\n')
+            count += 1
+            if lower is None and row.get('timestamp'):
+                lower = datetime.fromisoformat(row['timestamp'])
+            if count % EXPORT_PROGRESS_EVERY == 0 and lower and row.get('timestamp'):
+                timestamp = datetime.fromisoformat(row['timestamp'])
+                span = (upper - lower).total_seconds()
+                percent = 100.0 * (timestamp - lower).total_seconds() / span if span > 0 else 0.0
+                job.progress(min(99.0, percent), f'{count} rows written')
+    return {'file': path, 'rows': count}
+
+
+@job_handler('tax_lot_report')
+def tax_lot_report_job(payload, job):
+    """Apply pending transactions to every client's lots and write gain reports"""
+    job.progress(0, 'Applying new transactions to tax lots')
+    # Applying lots is the bulk of the work; reports are two grouped queries
+    applied = apply_all_clients(progress=lambda percent, message: job.progress(percent * 0.9, message))
+    year = payload.get('year')
+
+    job.progress(90, 'Writing gain reports')
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f'tax_lot_report_{job.job_id}.jsonl.gz')
+    reports = gain_reports(year)
+    with gzip.open(path, 'wt', encoding='utf-8') as export:
+        for report in reports:
+            export.write(json.dumps(report) + '\n')
+    return {
+        'file': path,
+        'clients': len(reports),
+        'clients_updated': len(applied),
+        'transactions_applied': sum(applied.values())
+    }
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, update
+from src.models.job import Job
+from src.models.user import db
+
+# Job worker configuration
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+JOB_RETRY_BACKOFF_SECONDS = int(os.getenv('JOB_RETRY_BACKOFF_SECONDS', '30'))
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', str(JOB_LEASE_SECONDS / 3)))
+JOB_CLAIM_CANDIDATES = 5
+
+JOB_HANDLERS = {}
+
+
+def job_handler(job_type):
+    """Register a function(payload, job_context) as the handler for job_type"""
+    def decorator(f):
+        JOB_HANDLERS[job_type] = f
+        return f
+    return decorator
+
+
+def enqueue_job(job_type, payload=None, priority=0, max_attempts=3, run_after=None,
+                client_id=None, admin_user_id=None):
+    """Persist a job for the workers and return it"""
+    job = Job(
+        job_type=job_type,
+        payload=json.dumps(payload or {}),
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=run_after or datetime.utcnow(),
+        client_id=client_id,
+        admin_user_id=admin_user_id
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def runnable_criteria(now):
+    """Queued jobs that are due, or running jobs whose lease has expired"""
+    return or_(
+        and_(Job.status == 'queued', Job.run_after <= now),
+        and_(Job.status == 'running', Job.locked_until < now, Job.attempts < Job.max_attempts)
+    )
+
+
+def fail_expired_jobs(now):
+    """Fail running jobs whose lease expired on their final attempt
+
+    runnable_criteria never reclaims these, so without the sweep a worker
+    dying on the last attempt would leave the job running forever.
+    """
+    failed = db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.locked_until < now, Job.attempts >= Job.max_attempts)
+        .values(
+            status='failed',
+            locked_by=None,
+            locked_until=None,
+            error='Worker lease expired on the final attempt',
+            finished_at=now
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if failed:
+        logging.error(f"Failed {failed} job(s) whose worker lease expired on the final attempt")
+    return failed
+
+
+def claim_job(worker_id):
+    """Lease the highest-priority runnable job for worker_id, or return None
+
+    The claim is a compare-and-set UPDATE guarded by the same criteria used
+    to pick the candidate, so two workers can never both win the same job.
+    """
+    now = datetime.utcnow()
+    fail_expired_jobs(now)
+    query = Job.query.with_entities(Job.id).filter(runnable_criteria(now)).order_by(
+        Job.priority.desc(),
+        Job.id
+    ).limit(JOB_CLAIM_CANDIDATES)
+    if db.engine.dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+
+    for (job_id,) in query.all():
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, runnable_criteria(now))
+            .values(
+                status='running',
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                attempts=Job.attempts + 1,
+                started_at=now,
+                error=None
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed:
+            db.session.commit()
+            return db.session.get(Job, job_id)
+    db.session.commit()
+    return None
+
+
+class JobContext:
+    """Handle given to job handlers for progress reporting"""
+
+    def __init__(self, job_id, worker_id):
+        self.job_id = job_id
+        self.worker_id = worker_id
+
+    def progress(self, percent, message=None):
+        """Record progress and extend the lease
+
+        Written on its own connection so the handler's open transaction is
+        not committed as a side effect. Best effort: on SQLite the write can
+        be locked out by the handler's own open read, which must not fail
+        the job.
+        """
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(Job)
+                    .where(Job.id == self.job_id, Job.locked_by == self.worker_id)
+                    .values(
+                        progress=max(0.0, min(100.0, float(percent))),
+                        progress_message=(message or '')[:255] or None,
+                        locked_until=datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+                    )
+                )
+        except Exception as e:
+            logging.warning(f"Could not record progress for job {self.job_id}: {e}")
+
+
+class LeaseHeartbeat:
+    """Renew a job's lease from a side thread while its handler runs
+
+    Without it a handler that runs past the lease without reporting progress
+    could be reclaimed and run a second time by another worker.
+    """
+
+    def __init__(self, job_id, worker_id):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self._engine = db.engine
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-heartbeat-{job_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                with self._engine.begin() as connection:
+                    connection.execute(
+                        update(Job)
+                        .where(Job.id == self.job_id, Job.locked_by == self.worker_id)
+                        .values(locked_until=datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS))
+                    )
+            except Exception as e:
+                logging.warning(f"Could not renew lease for job {self.job_id}: {e}")
+
+
+def finish_job(job_id, worker_id, values):
+    """Store the outcome of a job if worker_id still holds its lease"""
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id)
+        .values(locked_by=None, locked_until=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def run_job(job, worker_id):
+    """Execute one claimed job and record success, retry or failure"""
+    handler = JOB_HANDLERS.get(job.job_type)
+    job_id, attempts, max_attempts = job.id, job.attempts, job.max_attempts
+    try:
+        if handler is None:
+            raise RuntimeError(f'No handler registered for job type {job.job_type}')
+        with LeaseHeartbeat(job_id, worker_id):
+            result = handler(json.loads(job.payload or '{}'), JobContext(job_id, worker_id))
+        finish_job(job_id, worker_id, {
+            'status': 'succeeded',
+            'progress': 100.0,
+            'result': json.dumps(result) if result is not None else None,
+            'finished_at': datetime.utcnow()
+        })
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Job {job_id} ({job.job_type}) attempt {attempts} failed: {e}")
+        if attempts < max_attempts and handler is not None:
+            finish_job(job_id, worker_id, {
+                'status': 'queued',
+                'error': str(e),
+                'run_after': datetime.utcnow() + timedelta(seconds=JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+            })
+        else:
+            finish_job(job_id, worker_id, {
+                'status': 'failed',
+                'error': str(e),
+                'finished_at': datetime.utcnow()
+            })
+
+
+def worker_loop(app, worker_id, stop_event):
+    """Claim and run jobs until stop_event is set"""
+    with app.app_context():
+        while not stop_event.is_set():
+            try:
+                job = claim_job(worker_id)
+                if job is None:
+                    stop_event.wait(JOB_POLL_INTERVAL)
+                    continue
+                run_job(job, worker_id)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Job worker {worker_id} error: {e}")
+                stop_event.wait(JOB_POLL_INTERVAL)
+            finally:
+                db.session.remove()
+
+
+def start_workers(app, threads):
+    """Start a pool of worker threads; return the event that stops them"""
+    # Register the built-in handlers before any job is claimed
+    import src.utils.job_handlers  # noqa: F401
+
+    stop_event = threading.Event()
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    for index in range(threads):
+        threading.Thread(
+            target=worker_loop,
+            args=(app, f'{prefix}:{index}', stop_event),
+            name=f'job-worker-{index}',
+            daemon=True
+        ).start()
+    return stop_event
+
+
+def run_workers(app, threads):
+    """Run a worker pool in the foreground until interrupted"""
+    stop_event = start_workers(app, threads)
+    try:
+        while not stop_event.is_set():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_event.set()
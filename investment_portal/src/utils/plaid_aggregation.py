@@ -0,0 +1,114 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Fan-out configuration for multi-institution fetches
+PLAID_FETCH_MAX_WORKERS = int(os.getenv('PLAID_FETCH_MAX_WORKERS', '8'))
+PLAID_FETCH_TIMEOUT = float(os.getenv('PLAID_FETCH_TIMEOUT', '30'))
+
+
+def item_snapshot(item):
+    """Copy the fields a fetch needs so worker threads never touch the ORM session"""
+    return {
+        'id': item.id,
+        'item_id': item.item_id,
+        'access_token': item.access_token,
+        'institution_id': item.institution_id,
+        'institution_name': item.institution_name
+    }
+
+
+def fetch_items_concurrently(items, fetch, timeout=PLAID_FETCH_TIMEOUT):
+    """Call fetch(item) for every item in parallel
+
+    Returns (results, errors) where results is a list of (item, payload) in
+    item order and errors maps item_id to an error message. Total latency is
+    bounded by the slowest item (or the timeout), not the sum of all items.
+    """
+    if not items:
+        return [], {}
+
+    executor = ThreadPoolExecutor(max_workers=min(len(items), PLAID_FETCH_MAX_WORKERS))
+    try:
+        futures = [(item, executor.submit(fetch, item)) for item in items]
+        wait([future for _, future in futures], timeout=timeout)
+
+        results = []
+        errors = {}
+        for item, future in futures:
+            if not future.done():
+                errors[item['item_id']] = 'Timed out fetching institution data'
+                continue
+            try:
+                results.append((item, future.result()))
+            except Exception as e:
+                logging.error(f"Plaid fetch failed for item {item['item_id']}: {e}")
+                errors[item['item_id']] = str(e)
+        return results, errors
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def merge_securities(payloads):
+    """Merge security lists, keeping one entry per security_id"""
+    securities = {}
+    for payload in payloads:
+        for security in payload.get('securities', []):
+            securities.setdefault(security['security_id'], security)
+    return list(securities.values())
+
+
+def merge_holdings(results):
+    """Merge per-item holdings payloads into one view"""
+    accounts = []
+    holdings = []
+    for item, payload in results:
+        for account in payload.get('accounts', []):
+            accounts.append(dict(account, item_id=item['item_id'], institution_name=item['institution_name']))
+        for holding in payload.get('holdings', []):
+            holdings.append(dict(holding, item_id=item['item_id']))
+
+    return {
+        'accounts': accounts,
+        'holdings': holdings,
+        'securities': merge_securities(payload for _, payload in results)
+    }
+
+
+def merge_transactions(results):
+    """Merge per-item transaction payloads, newest first"""
+    transactions = []
+    for item, payload in results:
+        for transaction in payload.get('transactions', []):
+            transactions.append(dict(transaction, item_id=item['item_id']))
+    transactions.sort(key=lambda transaction: transaction.get('date', ''), reverse=True)
+
+    return {
+        'transactions': transactions,
+        'securities': merge_securities(payload for _, payload in results)
+    }
+
+
+def merge_portfolio_summaries(results):
+    """Merge per-item portfolio summaries and recompute allocation percentages"""
+    total_value = 0.0
+    account_balances = {}
+    allocation = {}
+    for item, payload in results:
+        total_value += payload.get('total_value', 0.0)
+        for account_id, balance in payload.get('account_balances', {}).items():
+            account_balances[account_id] = dict(balance, item_id=item['item_id'])
+        for asset_class, bucket in payload.get('asset_allocation', {}).items():
+            allocation[asset_class] = allocation.get(asset_class, 0.0) + bucket.get('value', 0.0)
+
+    return {
+        'total_value': round(total_value, 2),
+        'account_balances': account_balances,
+        'asset_allocation': {
+            asset_class: {
+                'value': round(value, 2),
+                'percentage': round(value / total_value * 100, 1) if total_value else 0.0
+            }
+            for asset_class, value in allocation.items()
+        }
+    }
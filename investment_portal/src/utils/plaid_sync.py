@@ -0,0 +1,335 @@
+import os
+from datetime import date, datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+from src.models.plaid import PlaidItem
+from src.models.holding import Holding
+from src.models.transaction import InvestmentTransaction
+from src.utils.plaid_aggregation import item_snapshot, fetch_items_concurrently, merge_holdings
+from src.utils.revaluation import apply_latest_prices
+from src.utils.security_master import sync_securities
+from src.utils.tax_lots import apply_client
+
+# Plaid configuration - simplified for demo
+# In production, you would use actual Plaid credentials
+PLAID_CLIENT_ID = os.getenv('PLAID_CLIENT_ID', 'demo_client_id')
+PLAID_SECRET = os.getenv('PLAID_SECRET', 'demo_secret')
+PLAID_ENV = os.getenv('PLAID_ENV', 'sandbox')
+
+# For demo purposes, we'll create mock responses
+# In production, you would configure the actual Plaid client
+
+# Securities referenced by the mock holdings and transactions
+MOCK_SECURITIES = [
+    {
+        'security_id': 'sec_001',
+        'name': 'Apple Inc.',
+        'ticker_symbol': 'AAPL',
+        'type': 'equity'
+    },
+    {
+        'security_id': 'sec_002',
+        'name': 'Microsoft Corporation',
+        'ticker_symbol': 'MSFT',
+        'type': 'equity'
+    },
+    {
+        'security_id': 'sec_003',
+        'name': 'Vanguard S&P 500 ETF',
+        'ticker_symbol': 'VOO',
+        'type': 'etf'
+    }
+]
+
+
+def mock_portfolio_summary(account_prefix='acc'):
+    """Mock portfolio summary for one linked item"""
+    return {
+        'total_value': 125750.50,
+        'account_balances': {
+            f'{account_prefix}_001': {
+                'name': 'Investment Account',
+                'balance': 85250.25
+            },
+            f'{account_prefix}_002': {
+                'name': 'Retirement Account',
+                'balance': 40500.25
+            }
+        },
+        'asset_allocation': {
+            'stocks': {
+                'value': 75450.30,
+                'percentage': 60.0
+            },
+            'bonds': {
+                'value': 25150.10,
+                'percentage': 20.0
+            },
+            'cash': {
+                'value': 12575.05,
+                'percentage': 10.0
+            },
+            'other': {
+                'value': 12575.05,
+                'percentage': 10.0
+            }
+        }
+    }
+
+
+def mock_holdings(account_prefix='acc'):
+    """Mock holdings for one linked item"""
+    return {
+        'accounts': [
+            {
+                'account_id': f'{account_prefix}_001',
+                'name': 'Investment Account',
+                'type': 'investment',
+                'subtype': 'brokerage'
+            },
+            {
+                'account_id': f'{account_prefix}_002',
+                'name': 'Retirement Account',
+                'type': 'investment',
+                'subtype': '401k'
+            }
+        ],
+        'holdings': [
+            {
+                'account_id': f'{account_prefix}_001',
+                'security_id': 'sec_001',
+                'quantity': 100,
+                'institution_price': 150.25,
+                'institution_value': 15025.00,
+                'cost_basis': 140.00
+            },
+            {
+                'account_id': f'{account_prefix}_001',
+                'security_id': 'sec_002',
+                'quantity': 50,
+                'institution_price': 85.50,
+                'institution_value': 4275.00,
+                'cost_basis': 80.00
+            },
+            {
+                'account_id': f'{account_prefix}_002',
+                'security_id': 'sec_003',
+                'quantity': 200,
+                'institution_price': 45.75,
+                'institution_value': 9150.00,
+                'cost_basis': 42.00
+            }
+        ],
+        'securities': [dict(security) for security in MOCK_SECURITIES]
+    }
+
+
+def mock_transactions(account_prefix='acc'):
+    """Mock investment transactions for one linked item"""
+    return {
+        'transactions': [
+            {
+                'account_id': f'{account_prefix}_001',
+                'security_id': 'sec_001',
+                'date': '2025-01-15',
+                'name': 'Apple Inc.',
+                'type': 'buy',
+                'subtype': 'buy',
+                'quantity': 10,
+                'price': 150.25,
+                'amount': 1502.50,
+                'fees': 0.00
+            },
+            {
+                'account_id': f'{account_prefix}_001',
+                'security_id': 'sec_002',
+                'date': '2025-01-10',
+                'name': 'Microsoft Corporation',
+                'type': 'buy',
+                'subtype': 'buy',
+                'quantity': 25,
+                'price': 85.50,
+                'amount': 2137.50,
+                'fees': 0.00
+            },
+            {
+                'account_id': f'{account_prefix}_002',
+                'security_id': 'sec_003',
+                'date': '2025-01-05',
+                'name': 'Vanguard S&P 500 ETF',
+                'type': 'buy',
+                'subtype': 'buy',
+                'quantity': 50,
+                'price': 45.75,
+                'amount': 2287.50,
+                'fees': 0.00
+            }
+        ],
+        'securities': [dict(security) for security in MOCK_SECURITIES]
+    }
+
+
+def fetch_item_portfolio_summary(item):
+    """Fetch portfolio summary for one item (would call /accounts/balance/get)"""
+    return mock_portfolio_summary(f"{item['item_id']}_acc")
+
+
+def fetch_item_holdings(item):
+    """Fetch holdings for one item (would call /investments/holdings/get)"""
+    return mock_holdings(f"{item['item_id']}_acc")
+
+
+def fetch_item_transactions(item):
+    """Fetch transactions for one item (would call /investments/transactions/get)"""
+    return mock_transactions(f"{item['item_id']}_acc")
+
+
+def client_item_snapshots(client_id):
+    """Snapshot the linked items of a client"""
+    items = PlaidItem.query.filter_by(client_id=client_id).order_by(PlaidItem.id).all()
+    return [item_snapshot(item) for item in items]
+
+
+def store_holdings(client_id, results):
+    """Replace the stored positions of each synced item in bulk"""
+    if not results:
+        return
+    Holding.query.filter(
+        Holding.plaid_item_id.in_([item['id'] for item, _ in results])
+    ).delete(synchronize_session=False)
+    rows = [
+        {
+            'client_id': client_id,
+            'plaid_item_id': item['id'],
+            'account_id': holding['account_id'],
+            'security_id': holding['security_id'],
+            'quantity': holding.get('quantity') or 0.0,
+            'cost_basis': holding.get('cost_basis'),
+            'institution_price': holding.get('institution_price'),
+            'institution_value': holding.get('institution_value'),
+            'price_as_of': date.fromisoformat(holding['price_as_of']) if holding.get('price_as_of') else None,
+            'updated_at': datetime.utcnow()
+        }
+        for item, payload in results
+        # Keep positions revalued across syncs
+        for holding in apply_latest_prices([dict(holding) for holding in payload.get('holdings', [])])
+    ]
+    if rows:
+        db.session.execute(Holding.__table__.insert(), rows)
+
+
+def transaction_key(transaction):
+    """Stable per-item ID for a Plaid investment transaction"""
+    return transaction.get('investment_transaction_id') or ':'.join(
+        str(transaction.get(field)) for field in ('account_id', 'date', 'security_id', 'type', 'quantity', 'amount')
+    )
+
+
+def transaction_keys(transactions):
+    """transaction_key for each transaction, numbering repeats of a fallback key
+
+    Identical trades on the same day share a fallback key; the second and
+    later ones get an occurrence suffix so they are stored as separate rows.
+    """
+    seen = {}
+    keys = []
+    for transaction in transactions:
+        key = transaction_key(transaction)
+        if not transaction.get('investment_transaction_id'):
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] > 1:
+                key = f'{key}:{seen[key]}'
+        keys.append(key)
+    return keys
+
+
+def store_transactions(client_id, results):
+    """Append newly seen transactions of each synced item, skipping ones already stored"""
+    rows = [
+        {
+            'client_id': client_id,
+            'plaid_item_id': item['id'],
+            'transaction_id': key,
+            'account_id': transaction['account_id'],
+            'security_id': transaction.get('security_id'),
+            'date': date.fromisoformat(transaction['date']),
+            'name': transaction.get('name'),
+            'type': transaction.get('type'),
+            'subtype': transaction.get('subtype'),
+            'quantity': transaction.get('quantity'),
+            'price': transaction.get('price'),
+            'amount': transaction.get('amount'),
+            'fees': transaction.get('fees'),
+            'created_at': datetime.utcnow()
+        }
+        for item, payload in results
+        for transaction, key in zip(payload.get('transactions', []), transaction_keys(payload.get('transactions', [])))
+    ]
+    if not rows:
+        return
+
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert(InvestmentTransaction.__table__)
+        db.session.execute(
+            insert.on_conflict_do_nothing(index_elements=['plaid_item_id', 'transaction_id']),
+            rows
+        )
+    else:
+        for row in rows:
+            if not InvestmentTransaction.query.filter_by(
+                plaid_item_id=row['plaid_item_id'], transaction_id=row['transaction_id']
+            ).first():
+                db.session.add(InvestmentTransaction(**row))
+
+
+def fetch_item_sync(item):
+    """Fetch holdings and transactions for one item"""
+    payload = fetch_item_holdings(item)
+    transactions = fetch_item_transactions(item)
+    payload['transactions'] = transactions['transactions']
+    payload['securities'] = payload['securities'] + transactions['securities']
+    return payload
+
+
+def sync_client_items(client_id, progress=None):
+    """Fetch every linked institution of a client concurrently and store the results
+
+    progress, if given, is called as progress(percent, message) between steps.
+    """
+    items = client_item_snapshots(client_id)
+    results, errors = fetch_items_concurrently(items, fetch_item_sync)
+    if progress:
+        progress(50, f'Storing data from {len(results)} of {len(items)} institution(s)')
+    sync_securities(merge_holdings(results)['securities'])
+    store_holdings(client_id, results)
+    store_transactions(client_id, results)
+
+    # Record sync outcome per item in one commit
+    now = datetime.utcnow()
+    synced = {item['id'] for item, _ in results}
+    for item in PlaidItem.query.filter_by(client_id=client_id).all():
+        if item.id in synced:
+            item.last_synced_at = now
+            item.last_error = None
+        elif item.item_id in errors:
+            item.last_error = errors[item.item_id]
+    db.session.commit()
+
+    # Fold the newly stored transactions into the client's tax lots
+    if progress:
+        progress(80, 'Updating tax lots')
+    apply_client(client_id)
+
+    return {
+        'synced': len(results),
+        'failed': len(errors),
+        'items': [
+            {
+                'item_id': item['item_id'],
+                'status': 'error' if item['item_id'] in errors else 'ok',
+                'error': errors.get(item['item_id'])
+            }
+            for item in items
+        ]
+    }
@@ -0,0 +1,71 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from src.models.client import Client
+
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', '10000'))
+# Bounds staleness across workers, which do not share version bumps
+PROFILE_CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', '30'))
+
+
+class ProfileCache:
+    """Read-through cache of Client.to_dict() keyed by client ID
+
+    Every write that changes what a profile shows bumps the client's version,
+    so the next read reloads from the database.
+    """
+
+    def __init__(self, max_size=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, client_id):
+        """Cached profile dict for client_id, or None if the client does not exist"""
+        now = time.monotonic()
+        with self._lock:
+            version = self._versions.get(client_id, 0)
+            entry = self._entries.get(client_id)
+            if entry and entry[0] == version and entry[1] > now:
+                self._entries.move_to_end(client_id)
+                return entry[2]
+
+        client = Client.query.get(client_id)
+        if not client:
+            return None
+        profile = client.to_dict()
+
+        with self._lock:
+            # A bump during the load means this copy may already be stale
+            if self._versions.get(client_id, 0) == version:
+                self._entries[client_id] = (version, now + self.ttl, profile)
+                self._entries.move_to_end(client_id)
+                while len(self._entries) > self.max_size:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._versions.pop(evicted, None)
+        return profile
+
+    def bump(self, *client_ids):
+        """Invalidate the cached profiles of client_ids"""
+        bumped = set(client_ids)
+        with self._lock:
+            for client_id in bumped:
+                self._versions[client_id] = self._versions.get(client_id, 0) + 1
+                self._entries.pop(client_id, None)
+            if len(self._versions) > self.max_size:
+                # Versions only matter for cached entries and loads in flight
+                self._versions = {
+                    client_id: version for client_id, version in self._versions.items()
+                    if client_id in self._entries or client_id in bumped
+                }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+profile_cache = ProfileCache()
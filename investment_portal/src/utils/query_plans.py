@@ -0,0 +1,258 @@
+"""Query-plan regression check for the blueprint queries
+
+Drives every API endpoint against a throwaway database, records each SQL
+statement the blueprints issue and runs EXPLAIN QUERY PLAN (SQLite) or
+EXPLAIN (PostgreSQL, with sequential scans disabled) on it. Any full table
+or index scan or whole-result sort is reported as a failure.
+
+The check drops and recreates every table, so it only runs against an
+in-memory or temp-file SQLite database. A PostgreSQL scratch database must
+be confirmed by naming it in QUERY_PLAN_DROP_DATABASE.
+
+Usage (from the investment_portal directory):
+    python -m src.utils.query_plans
+    QUERY_PLAN_DATABASE_URL=postgresql://.../plan_scratch QUERY_PLAN_DROP_DATABASE=plan_scratch \\
+        python -m src.utils.query_plans
+"""
+import os
+import re
+import sys
+import json
+import tempfile
+from contextlib import contextmanager
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from src.models.user import db
+from src.models.admin import AdminUser, AuditLog
+from src.models.client import Client
+from src.models.plaid import PlaidItem
+from src.models.security import Security, SecurityPrice
+from src.models.holding import Holding, ClientValuation
+from src.models.transaction import InvestmentTransaction
+from src.models.tax_lot import TaxLot, RealizedGain, LotSelection, LotCursor
+from src.models.job import Job
+from src.models.analytics import DailyActivity
+from src.routes.auth import auth_bp
+from src.routes.plaid import plaid_bp
+from src.routes.admin import admin_bp
+
+QUERY_PLAN_DATABASE_URL = os.getenv('QUERY_PLAN_DATABASE_URL', 'sqlite://')
+QUERY_PLAN_DROP_DATABASE = os.getenv('QUERY_PLAN_DROP_DATABASE', '')
+
+# Scans accepted on one table in the one statement each pattern matches:
+# (table, statement pattern, reason)
+ALLOWED_SCANS = (
+    ('clients', re.compile(r'\blower\(clients\.first_name\) LIKE lower\(|\bclients\.first_name ILIKE\b'),
+     'admin client search is a leading-wildcard match a b-tree index cannot serve'),
+    ('client_valuations', re.compile(r'\bsum\(client_valuations\.total_value\), count\(client_valuations\.client_id\)'),
+     'AUM summary totals every client valuation by design'),
+)
+
+# Any SCAN of a table, whether bare or walking a (covering) index end to end
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)\b')
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+POSTGRESQL_INDEX_SCANS = ('Index Scan', 'Index Only Scan')
+
+
+def ensure_scratch_database(database_url):
+    """Raise unless database_url is safe to drop: in-memory or temp-file SQLite, or confirmed"""
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return
+        temp_dir = os.path.realpath(tempfile.gettempdir())
+        if os.path.commonpath([os.path.realpath(url.database), temp_dir]) == temp_dir:
+            return
+    elif url.database and url.database == QUERY_PLAN_DROP_DATABASE:
+        return
+    raise RuntimeError(
+        f'Refusing to drop tables in {url.render_as_string(hide_password=True)}: use an in-memory or '
+        f'temp-file SQLite database, or set QUERY_PLAN_DROP_DATABASE to the scratch database name'
+    )
+
+
+def create_plan_app(database_url=QUERY_PLAN_DATABASE_URL):
+    """Minimal app with the API blueprints bound to a scratch database"""
+    ensure_scratch_database(database_url)
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'query-plan-check'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.register_blueprint(plaid_bp, url_prefix='/api/plaid')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(admin_bp)
+    db.init_app(app)
+    return app
+
+
+def seed():
+    """Insert a small, representative data set"""
+    admin = AdminUser(username='plan_admin', email='plan_admin@example.com',
+                      first_name='Plan', last_name='Admin', role='super_admin')
+    admin.set_password('plan-password')
+    db.session.add(admin)
+    for index in range(20):
+        client = Client(email=f'client{index}@example.com', first_name='Client',
+                        last_name=str(index), is_active=index % 3 != 0)
+        client.set_password('plan-password')
+        db.session.add(client)
+    db.session.commit()
+    for index in range(20):
+        db.session.add(AuditLog(admin_user_id=admin.id, action='view_client',
+                                resource_type='client', resource_id=str(index)))
+    db.session.commit()
+
+
+def exercise_endpoints(app):
+    """Call every blueprint endpoint once with realistic sessions"""
+    with app.test_client() as admin_client:
+        admin_client.post('/api/admin/login', json={'username': 'plan_admin', 'password': 'plan-password'})
+        admin_client.get('/api/admin/me')
+        admin_client.get('/api/admin/clients')
+        admin_client.get('/api/admin/clients?status=active')
+        admin_client.get('/api/admin/clients?search=client1')
+        admin_client.get('/api/admin/clients/1')
+        admin_client.put('/api/admin/clients/1/status', json={'is_active': False})
+        admin_client.put('/api/admin/clients/status', json={'client_ids': [2, 3], 'is_active': False})
+        admin_client.put('/api/admin/clients/status', json={'filter': {'status': 'inactive'}, 'is_active': True})
+        admin_client.get('/api/admin/dashboard/stats')
+        admin_client.get('/api/admin/analytics/growth?granularity=quarter&periods=8')
+        admin_client.get('/api/admin/audit-logs')
+        admin_client.get('/api/admin/audit-logs/export?start_date=2000-01-01').get_data()
+        admin_client.post('/api/admin/jobs', json={'job_type': 'archive_audit_logs'})
+        admin_client.get('/api/admin/jobs?status=queued')
+        admin_client.get('/api/admin/jobs/1')
+        admin_client.post('/api/admin/logout')
+
+    with app.test_client() as client:
+        client.post('/api/auth/register', json={'email': 'plan_new@example.com', 'password': 'plan-password',
+                                                'first_name': 'New', 'last_name': 'Client'})
+        client.post('/api/auth/logout')
+        client.post('/api/auth/login', json={'email': 'client1@example.com', 'password': 'plan-password'})
+        client.get('/api/auth/status')
+        client.get('/api/auth/bootstrap')
+        client.get('/api/auth/profile')
+        client.put('/api/auth/profile', json={'phone': '555-0100'})
+        client.post('/api/auth/change-password', json={'current_password': 'plan-password',
+                                                       'new_password': 'plan-password'})
+        client.post('/api/plaid/create_link_token')
+        client.post('/api/plaid/exchange_public_token', json={'public_token': 'public-plan'})
+        client.get('/api/plaid/status')
+        client.get('/api/plaid/items')
+        client.get('/api/plaid/portfolio_summary')
+        client.get('/api/plaid/holdings')
+        client.get('/api/plaid/transactions')
+        client.post('/api/plaid/items/sync')
+        client.post('/api/plaid/items/sync?async=1')
+        client.get('/api/plaid/transactions/export?format=csv').get_data()
+        client.get('/api/plaid/transactions/export?format=qfx&start_date=2025-01-01').get_data()
+        client.get('/api/plaid/jobs/2')
+        client.get('/api/plaid/tax-lots')
+        client.get('/api/plaid/realized-gains?year=2025')
+        client.post('/api/plaid/tax-lots/selections', json={
+            'sell_transaction_id': 2, 'open_transaction_id': 1, 'quantity': 1
+        })
+        client.post('/api/plaid/disconnect')
+
+
+@contextmanager
+def capture_statements(engine):
+    """Record every distinct (statement, parameters) executed on engine"""
+    statements = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany and parameters:
+            parameters = parameters[0]
+        statements.setdefault(statement, parameters)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(connection, statement, parameters):
+    """Return the plan lines for statement and its scans as (table, line) pairs"""
+    if connection.dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        lines, scans = [], []
+
+        def walk(node, depth=0):
+            label = f"{node['Node Type']} {node.get('Relation Name', '')}".strip()
+            lines.append('  ' * depth + label)
+            # With seq scans disabled, a full index walk is what stands in for one
+            if node['Node Type'] == 'Seq Scan' or (
+                node['Node Type'] in POSTGRESQL_INDEX_SCANS and 'Index Cond' not in node
+            ):
+                scans.append((node.get('Relation Name'), label))
+            for child in node.get('Plans', []):
+                walk(child, depth + 1)
+
+        walk(plan[0]['Plan'])
+        return lines, scans
+
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    lines = [row[-1] for row in rows]
+    tables = set(db.metadata.tables)
+    scans = []
+    for line in lines:
+        match = SQLITE_SCAN.match(line)
+        if line == SQLITE_SORT:
+            scans.append((None, line))
+        elif match and match.group(1) in tables:
+            scans.append((match.group(1), line))
+    return lines, scans
+
+
+def unexpected_scans(statement, scans):
+    """Scan lines not covered by an ALLOWED_SCANS entry for this statement"""
+    return [
+        line for table, line in scans
+        if not any(table == allowed and pattern.search(statement) for allowed, pattern, _ in ALLOWED_SCANS)
+    ]
+
+
+def check_query_plans(app):
+    """Exercise the API and return a list of (statement, plan, scans) failures"""
+    ensure_scratch_database(app.config['SQLALCHEMY_DATABASE_URI'])
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed()
+        engine = db.engine
+        with capture_statements(engine) as statements:
+            exercise_endpoints(app)
+
+        failures = []
+        with engine.connect() as connection:
+            if connection.dialect.name == 'postgresql':
+                # Small tables always favour a seq scan; force the planner to show index usage
+                connection.exec_driver_sql('SET enable_seqscan = off')
+            for statement, parameters in statements.items():
+                if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                    continue
+                plan, scans = explain(connection, statement, parameters)
+                scans = unexpected_scans(statement, scans)
+                if scans:
+                    failures.append((statement, plan, scans))
+            connection.rollback()
+        db.drop_all()
+        return failures
+
+
+def main():
+    failures = check_query_plans(create_plan_app())
+    for statement, plan, scans in failures:
+        print(f'SCAN: {", ".join(scans)}\n  {statement}\n  plan:')
+        for line in plan:
+            print(f'    {line}')
+    print(f'{len(failures)} hot quer{"y" if len(failures) == 1 else "ies"} scanning')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, jsonify
+
+# Rate limiter configuration
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+RATE_LIMIT_TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', 'false').lower() == 'true'
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL')
+
+
+class MemoryBucketStore:
+    """In-process token buckets with a bounded, least-recently-used key set"""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        """Take tokens from a bucket; return (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens = float(capacity)
+            else:
+                tokens, updated = bucket
+                tokens = min(float(capacity), tokens + (now - updated) * refill_rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+
+            # Re-insert as most recently used and evict the oldest keys
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        if allowed:
+            return True, 0
+        return False, math.ceil((cost - tokens) / refill_rate)
+
+    def reset(self):
+        """Drop all tracked buckets"""
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBucketStore:
+    """Token buckets shared across workers through Redis"""
+
+    # Refill and consume atomically on the server so concurrent workers agree
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local now = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, refill_rate, cost=1):
+        """Take tokens from a bucket; return (allowed, retry_after_seconds)"""
+        allowed, tokens = self._script(
+            keys=[f'ratelimit:{key}'],
+            args=[capacity, refill_rate, cost, time.time()]
+        )
+        if allowed:
+            return True, 0
+        return False, math.ceil((cost - float(tokens)) / refill_rate)
+
+    def reset(self):
+        """Drop all tracked buckets"""
+        for key in self._client.scan_iter('ratelimit:*'):
+            self._client.delete(key)
+
+
+def create_bucket_store():
+    """Use the shared Redis backend when configured, else in-process buckets"""
+    if RATE_LIMIT_REDIS_URL:
+        try:
+            return RedisBucketStore(RATE_LIMIT_REDIS_URL)
+        except Exception as e:
+            logging.error(f"Rate limit Redis backend unavailable, using in-process buckets: {e}")
+    return MemoryBucketStore()
+
+
+bucket_store = create_bucket_store()
+# Used whenever the shared backend errors, so limits still apply per process
+fallback_store = bucket_store if isinstance(bucket_store, MemoryBucketStore) else MemoryBucketStore()
+
+
+def get_client_ip():
+    """Best-effort client address used for per-IP limits"""
+    if RATE_LIMIT_TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+
+def rate_limit(scope, ip_limit=(20, 60), account_limit=(5, 60), account_field=None):
+    """Decorator applying per-IP and per-account token buckets to a route
+
+    Limits are (burst capacity, seconds to fully refill). The account key is
+    read from ``account_field`` in the JSON body when present, and is scoped
+    to the client IP so attempts from elsewhere cannot lock the owner out.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return f(*args, **kwargs)
+
+            client_ip = get_client_ip()
+            checks = [(f'{scope}:ip:{client_ip}', ip_limit)]
+            if account_field:
+                data = request.get_json(silent=True)
+                account = data.get(account_field) if isinstance(data, dict) else None
+                if isinstance(account, str) and account.strip():
+                    checks.append((f'{scope}:account:{account.strip().lower()}:{client_ip}', account_limit))
+
+            retry_after = 0
+            for key, (capacity, period) in checks:
+                try:
+                    allowed, wait = bucket_store.consume(key, capacity, capacity / period)
+                except Exception as e:
+                    # Redis connects lazily, so an outage only shows up here
+                    logging.error(f"Rate limit backend failed, using in-process buckets: {e}")
+                    allowed, wait = fallback_store.consume(key, capacity, capacity / period)
+                if not allowed:
+                    retry_after = max(retry_after, wait)
+
+            if retry_after:
+                response = jsonify({
+                    'error': 'Too many requests, please try again later',
+                    'retry_after': retry_after
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
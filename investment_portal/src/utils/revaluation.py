@@ -0,0 +1,215 @@
+import os
+import csv
+import logging
+from datetime import date, datetime
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.holding import Holding, ClientValuation
+from src.models.security import Security, SecurityPrice
+from src.models.user import db
+
+PRICE_BATCH_SIZE = 5000
+# Price files queued through the admin API must live here
+PRICE_FILE_DIR = os.getenv(
+    'PRICE_FILE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'prices')
+)
+PRICE_FILE_EXTENSIONS = ('.csv', '.parquet')
+PRICE_COLUMNS = ('close', 'close_price', 'price')
+
+
+def resolve_price_file(name):
+    """Real path of a price file inside PRICE_FILE_DIR; raise ValueError otherwise"""
+    root = os.path.realpath(PRICE_FILE_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if (
+        os.path.commonpath([root, path]) != root
+        or not path.endswith(PRICE_FILE_EXTENSIONS)
+        or not os.path.isfile(path)
+    ):
+        raise ValueError(f'price_file must be a .csv or .parquet file in {PRICE_FILE_DIR}')
+    return path
+
+
+def iter_price_rows(path):
+    """Stream dict rows from a CSV or Parquet price file without loading it whole"""
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('Reading Parquet price files requires pyarrow')
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=PRICE_BATCH_SIZE):
+            yield from batch.to_pylist()
+        return
+
+    with open(path, newline='', encoding='utf-8') as price_file:
+        yield from csv.DictReader(price_file)
+
+
+def parse_price_row(row, ticker_map, default_date):
+    """Normalise one file row to a security_prices row, or None if unusable"""
+    security_id = row.get('security_id') or ticker_map.get((row.get('ticker_symbol') or row.get('ticker') or '').upper())
+    if not security_id:
+        return None
+
+    close = next((row[column] for column in PRICE_COLUMNS if row.get(column) not in (None, '')), None)
+    if close is None:
+        return None
+
+    price_date = row.get('date') or row.get('price_date') or default_date
+    if isinstance(price_date, str):
+        price_date = date.fromisoformat(price_date)
+    elif isinstance(price_date, datetime):
+        price_date = price_date.date()
+    return {'security_id': security_id, 'close_price': float(close), 'price_date': price_date}
+
+
+def upsert_prices(rows):
+    """Write one batch of closes in a single statement
+
+    A stored close is only replaced by one for the same or a later date, so
+    loading an older price file never moves prices backwards.
+    """
+    now = datetime.utcnow()
+    rows = [dict(row, updated_at=now) for row in rows]
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert(SecurityPrice.__table__).values(rows)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['security_id'],
+            set_={column: insert.excluded[column] for column in ('close_price', 'price_date', 'updated_at')},
+            where=insert.excluded.price_date >= SecurityPrice.__table__.c.price_date
+        ))
+    else:
+        for row in rows:
+            current = db.session.get(SecurityPrice, row['security_id'])
+            if current is None or row['price_date'] >= current.price_date:
+                db.session.merge(SecurityPrice(**row))
+
+
+def load_price_file(path, price_date=None):
+    """Stream a price file into security_prices; return (loaded, skipped)"""
+    default_date = price_date or date.today()
+    known_ids = set()
+    ticker_map = {}
+    for security_id, ticker_symbol in db.session.query(Security.security_id, Security.ticker_symbol):
+        known_ids.add(security_id)
+        if ticker_symbol:
+            ticker_map[ticker_symbol.upper()] = security_id
+
+    loaded = skipped = 0
+    batch = {}
+    for row in iter_price_rows(path):
+        price = parse_price_row(row, ticker_map, default_date)
+        if price is None or price['security_id'] not in known_ids:
+            skipped += 1
+            continue
+        # The latest close for a security wins within a batch, then file order
+        current = batch.get(price['security_id'])
+        if current is None or price['price_date'] >= current['price_date']:
+            batch[price['security_id']] = price
+        if len(batch) >= PRICE_BATCH_SIZE:
+            upsert_prices(list(batch.values()))
+            loaded += len(batch)
+            batch = {}
+    if batch:
+        upsert_prices(list(batch.values()))
+        loaded += len(batch)
+    return loaded, skipped
+
+
+def revalue_holdings():
+    """Reprice every holding from the latest closes in one set-based UPDATE"""
+    result = db.session.execute(
+        update(Holding)
+        .where(Holding.security_id == SecurityPrice.security_id)
+        .values(
+            institution_price=SecurityPrice.close_price,
+            institution_value=Holding.quantity * SecurityPrice.close_price,
+            price_as_of=SecurityPrice.price_date,
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def apply_latest_prices(holdings):
+    """Overlay the latest stored close onto Plaid-shaped holding dicts in place
+
+    Holdings without a loaded close keep the institution's price.
+    """
+    security_ids = {holding['security_id'] for holding in holdings if holding.get('security_id')}
+    if not security_ids:
+        return holdings
+    prices = {
+        price.security_id: price
+        for price in SecurityPrice.query.filter(SecurityPrice.security_id.in_(security_ids))
+    }
+    for holding in holdings:
+        price = prices.get(holding.get('security_id'))
+        if price:
+            holding['institution_price'] = price.close_price
+            holding['institution_value'] = (holding.get('quantity') or 0.0) * price.close_price
+            holding['price_as_of'] = price.price_date.isoformat()
+    return holdings
+
+
+def rebuild_client_valuations(as_of):
+    """Recompute every client's total from stored holdings in one statement"""
+    db.session.execute(ClientValuation.__table__.delete())
+    db.session.execute(
+        ClientValuation.__table__.insert().from_select(
+            ['client_id', 'total_value', 'holding_count', 'as_of', 'updated_at'],
+            select(
+                Holding.client_id,
+                func.coalesce(func.sum(Holding.institution_value), 0.0),
+                func.count(Holding.id),
+                literal(as_of, db.Date),
+                literal(datetime.utcnow(), db.DateTime)
+            ).group_by(Holding.client_id)
+        )
+    )
+
+
+def run_revaluation(path, price_date=None, progress=None):
+    """Ingest an end-of-day price file and revalue the whole book"""
+    price_date = price_date or date.today()
+    try:
+        loaded, skipped = load_price_file(path, price_date)
+        if not loaded:
+            raise ValueError(f'No usable prices in {os.path.basename(path)} ({skipped} rows skipped)')
+        if progress:
+            progress(60, f'Loaded {loaded} prices; revaluing holdings')
+        revalued = revalue_holdings()
+        if progress:
+            progress(80, 'Rebuilding client valuations')
+        rebuild_client_valuations(price_date)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    total_aum = db.session.query(func.coalesce(func.sum(ClientValuation.total_value), 0.0)).scalar()
+    logging.info(f"Revaluation {price_date}: {loaded} prices, {revalued} holdings, AUM {total_aum:.2f}")
+    return {
+        'price_date': price_date.isoformat(),
+        'prices_loaded': loaded,
+        'rows_skipped': skipped,
+        'holdings_revalued': revalued,
+        'total_aum': round(total_aum, 2)
+    }
+
+
+def get_aum_summary():
+    """Total AUM and average portfolio value from the latest revaluation, or None"""
+    total_aum, client_count = db.session.query(
+        func.sum(ClientValuation.total_value),
+        func.count(ClientValuation.client_id)
+    ).one()
+    if not client_count:
+        return None
+    return {
+        'total_aum': round(total_aum or 0.0, 2),
+        'average_portfolio_value': round((total_aum or 0.0) / client_count, 2)
+    }
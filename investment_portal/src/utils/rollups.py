@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.admin import AuditLog
+from src.models.analytics import DailyActivity
+from src.models.client import Client
+from src.models.user import db
+
+ROLLUP_COUNTERS = ('signups', 'active_logins', 'activations', 'suspensions')
+GRANULARITIES = ('week', 'month', 'quarter')
+
+
+def record_activity(day=None, **increments):
+    """Add increments to a day's (UTC) counters in the caller's transaction"""
+    increments = {counter: value for counter, value in increments.items() if value}
+    if not increments:
+        return
+    row = dict({counter: 0 for counter in ROLLUP_COUNTERS}, **increments, day=day or datetime.utcnow().date())
+
+    table = DailyActivity.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert(table).values(row)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['day'],
+            set_={counter: table.c[counter] + insert.excluded[counter] for counter in increments}
+        ))
+    else:
+        activity = db.session.get(DailyActivity, row['day']) or DailyActivity(day=row['day'], **{
+            counter: 0 for counter in ROLLUP_COUNTERS
+        })
+        for counter, value in increments.items():
+            setattr(activity, counter, getattr(activity, counter) + value)
+        db.session.add(activity)
+
+
+def record_login(client, now):
+    """Set the client's last login, counting them active on their first login of the day
+
+    The conditional UPDATE decides "first today" in the database, so
+    concurrent logins by the same client are counted once.
+    """
+    first_today = db.session.execute(
+        update(Client)
+        .where(
+            Client.id == client.id,
+            or_(Client.last_login.is_(None), Client.last_login < datetime.combine(now.date(), time.min))
+        )
+        .values(last_login=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if first_today:
+        record_activity(now.date(), active_logins=1)
+
+
+def period_start(day, granularity):
+    """First day of the week (Monday), month or quarter containing day"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+
+
+def previous_period_start(start, granularity):
+    if granularity == 'week':
+        return start - timedelta(days=7)
+    months = 1 if granularity == 'month' else 3
+    index = start.year * 12 + start.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def activity_series(granularity='month', periods=12, today=None):
+    """Bucketed counters for the last periods weeks, months or quarters
+
+    Reads at most one rollup row per day in range, so cost is independent of
+    total history length.
+    """
+    start = period_start(today or datetime.utcnow().date(), granularity)
+    buckets = OrderedDict()
+    starts = [start]
+    for _ in range(periods - 1):
+        starts.append(previous_period_start(starts[-1], granularity))
+    for bucket_start in reversed(starts):
+        buckets[bucket_start] = dict({counter: 0 for counter in ROLLUP_COUNTERS}, period_start=bucket_start.isoformat())
+
+    rows = DailyActivity.query.filter(DailyActivity.day >= starts[-1]).all()
+    for row in rows:
+        bucket = buckets.get(period_start(row.day, granularity))
+        if bucket is None:
+            continue
+        for counter in ROLLUP_COUNTERS:
+            bucket[counter] += getattr(row, counter)
+    return list(buckets.values())
+
+
+def signups_since(day):
+    """Total signups from day onwards"""
+    return db.session.query(func.coalesce(func.sum(DailyActivity.signups), 0)).filter(
+        DailyActivity.day >= day
+    ).scalar()
+
+
+def rebuild_rollups():
+    """Recompute all counters from clients and audit logs
+
+    Historic daily active logins cannot be reconstructed (only the latest
+    login is stored), so existing active_logins values are kept. Likewise
+    activations and suspensions are only recomputed from the oldest hot
+    audit log onwards; earlier days were archived out of audit_logs.
+    """
+    counters = {}
+
+    def bump(day, counter, value):
+        counters.setdefault(day, {name: 0 for name in ROLLUP_COUNTERS})[counter] += value
+
+    signup_day = func.date(Client.created_at)
+    for day, count in db.session.query(signup_day, func.count(Client.id)).filter(
+        Client.created_at.isnot(None)
+    ).group_by(signup_day):
+        bump(date.fromisoformat(str(day)), 'signups', count)
+
+    audit_day = func.date(AuditLog.timestamp)
+    for day, action, count in db.session.query(audit_day, AuditLog.action, func.count(AuditLog.id)).filter(
+        AuditLog.action.in_(('activate_client', 'suspend_client'))
+    ).group_by(audit_day, AuditLog.action):
+        bump(date.fromisoformat(str(day)), 'activations' if action == 'activate_client' else 'suspensions', count)
+
+    oldest_audit = db.session.query(func.min(AuditLog.timestamp)).scalar()
+    audit_cutoff = oldest_audit.date() if oldest_audit else None
+
+    kept = db.session.query(
+        DailyActivity.day, DailyActivity.active_logins, DailyActivity.activations, DailyActivity.suspensions
+    ).all()
+    db.session.execute(DailyActivity.__table__.delete())
+    for day, active_logins, activations, suspensions in kept:
+        values = counters.setdefault(day, {name: 0 for name in ROLLUP_COUNTERS})
+        values['active_logins'] = active_logins
+        if audit_cutoff is None or day < audit_cutoff:
+            values['activations'] = activations
+            values['suspensions'] = suspensions
+    if counters:
+        db.session.execute(DailyActivity.__table__.insert(), [
+            dict(values, day=day) for day, values in counters.items()
+        ])
+    db.session.commit()
+    return len(counters)
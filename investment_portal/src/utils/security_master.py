@@ -0,0 +1,116 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.security import Security
+from src.models.user import db
+
+SECURITY_CACHE_SIZE = int(os.getenv('SECURITY_CACHE_SIZE', '10000'))
+# Bounds staleness across workers, which do not see each other's upserts
+SECURITY_CACHE_TTL = float(os.getenv('SECURITY_CACHE_TTL', '300'))
+SECURITY_FIELDS = ('name', 'ticker_symbol', 'type')
+
+
+class SecurityCache:
+    """Process-wide LRU cache of security metadata keyed by security_id"""
+
+    def __init__(self, max_size=SECURITY_CACHE_SIZE, ttl=SECURITY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, security_ids):
+        """Metadata for each known id, loading cache misses in one query"""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for security_id in security_ids:
+                entry = self._entries.get(security_id)
+                if entry is None or entry[0] <= now:
+                    missing.append(security_id)
+                else:
+                    self._entries.move_to_end(security_id)
+                    found[security_id] = entry[1]
+
+        if missing:
+            loaded = {
+                security.security_id: security.to_dict()
+                for security in Security.query.filter(Security.security_id.in_(missing)).all()
+            }
+            self.put_many(loaded.values())
+            found.update(loaded)
+        return found
+
+    def put_many(self, securities):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for security in securities:
+                self._entries[security['security_id']] = (expires, security)
+                self._entries.move_to_end(security['security_id'])
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+security_cache = SecurityCache()
+
+
+def upsert_securities(securities):
+    """Insert or update many securities in a single statement"""
+    rows = [
+        dict({field: security.get(field) for field in SECURITY_FIELDS},
+             security_id=security['security_id'], updated_at=datetime.utcnow())
+        for security in securities
+    ]
+    if not rows:
+        return
+
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert(Security.__table__).values(rows)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['security_id'],
+            set_={field: insert.excluded[field] for field in SECURITY_FIELDS + ('updated_at',)}
+        ))
+    else:
+        for row in rows:
+            db.session.merge(Security(**row))
+    db.session.commit()
+    security_cache.put_many(
+        {field: row[field] for field in ('security_id',) + SECURITY_FIELDS} for row in rows
+    )
+
+
+def sync_securities(securities):
+    """Record securities seen in a Plaid payload, writing only new or changed ones"""
+    incoming = {security['security_id']: security for security in securities}
+    known = security_cache.get_many(incoming)
+    changed = [
+        security for security_id, security in incoming.items()
+        if security_id not in known
+        or any(known[security_id].get(field) != security.get(field) for field in SECURITY_FIELDS)
+    ]
+    upsert_securities(changed)
+
+
+def securities_for(rows, fallback=()):
+    """Security metadata for every security referenced by rows, once each
+
+    Read-only: securities not yet in the master are taken from fallback
+    (typically the payload's own list) instead of being written.
+    """
+    security_ids = list(dict.fromkeys(row['security_id'] for row in rows if row.get('security_id')))
+    known = security_cache.get_many(security_ids)
+    for security in fallback:
+        if security.get('security_id') in security_ids and security['security_id'] not in known:
+            known[security['security_id']] = {
+                field: security.get(field) for field in ('security_id',) + SECURITY_FIELDS
+            }
+    return [known[security_id] for security_id in security_ids if security_id in known]
@@ -0,0 +1,198 @@
+import io
+import os
+import csv
+from datetime import datetime
+from xml.sax.saxutils import escape
+from sqlalchemy import func, select, tuple_
+from src.models.transaction import InvestmentTransaction
+from src.models.user import db
+from src.utils.security_master import security_cache
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '1000'))
+QFX_INTU_BID = os.getenv('QFX_INTU_BID', '00000')
+EXPORT_FORMATS = ('csv', 'ofx', 'qfx')
+
+CSV_COLUMNS = (
+    'date', 'account_id', 'transaction_id', 'type', 'subtype', 'name',
+    'ticker_symbol', 'security_name', 'quantity', 'price', 'amount', 'fees'
+)
+
+transactions = InvestmentTransaction.__table__
+
+
+def client_criteria(client_id, start=None, end=None, account_id=None):
+    criteria = [transactions.c.client_id == client_id]
+    if account_id is not None:
+        criteria.append(transactions.c.account_id == account_id)
+    if start:
+        criteria.append(transactions.c.date >= start)
+    if end:
+        criteria.append(transactions.c.date <= end)
+    return criteria
+
+
+def iter_transaction_chunks(client_id, start=None, end=None, account_id=None):
+    """Yield lists of transaction rows using keyset pagination
+
+    Each chunk is one indexed range query, so memory stays at one chunk no
+    matter how long the history is. Pass account_id to page one account on
+    the (client_id, account_id, date, id) index.
+    """
+    order = [transactions.c.date, transactions.c.id]
+    criteria = client_criteria(client_id, start, end, account_id)
+
+    last = None
+    while True:
+        query = select(transactions).where(*criteria)
+        if last is not None:
+            query = query.where(tuple_(*order) > tuple_(*last))
+        rows = db.session.execute(query.order_by(*order).limit(EXPORT_CHUNK_SIZE)).mappings().all()
+        if not rows:
+            return
+        yield rows
+        last = [rows[-1][column.name] for column in order]
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+
+
+def with_security(rows):
+    """Attach ticker and security name from the security master"""
+    securities = security_cache.get_many({row['security_id'] for row in rows if row['security_id']})
+    for row in rows:
+        security = securities.get(row['security_id']) or {}
+        yield row, security
+
+
+def format_number(value):
+    return '' if value is None else f'{value:.6f}'.rstrip('0').rstrip('.')
+
+
+def stream_csv(client_id, start=None, end=None):
+    """Generate a CSV statement chunk by chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+
+    for rows in iter_transaction_chunks(client_id, start, end):
+        buffer.seek(0)
+        buffer.truncate()
+        for row, security in with_security(rows):
+            writer.writerow((
+                row['date'].isoformat(), row['account_id'], row['transaction_id'], row['type'],
+                row['subtype'], row['name'], security.get('ticker_symbol'), security.get('name'),
+                format_number(row['quantity']), format_number(row['price']),
+                format_number(row['amount']), format_number(row['fees'])
+            ))
+        yield buffer.getvalue()
+
+
+def ofx_date(value):
+    return value.strftime('%Y%m%d')
+
+
+def ofx_secid(security_id, security):
+    """SECID element shared by transactions and the security list"""
+    unique_id = escape(security.get('ticker_symbol') or security_id)
+    unique_type = 'TICKER' if security.get('ticker_symbol') else 'OTHER'
+    return f'<SECID><UNIQUEID>{unique_id}</UNIQUEID><UNIQUEIDTYPE>{unique_type}</UNIQUEIDTYPE></SECID>'
+
+
+def ofx_security_list(securities):
+    """SECLISTMSGSRSV1 describing every security the statement references"""
+    parts = ['<SECLISTMSGSRSV1><SECLIST>\n']
+    for security_id, security in sorted(securities.items()):
+        tag = {'equity': 'STOCKINFO', 'etf': 'STOCKINFO', 'mutual fund': 'MFINFO'}.get(
+            (security.get('type') or '').lower(), 'OTHERINFO'
+        )
+        ticker = f'<TICKER>{escape(security["ticker_symbol"])}</TICKER>' if security.get('ticker_symbol') else ''
+        parts.append(
+            f'<{tag}><SECINFO>{ofx_secid(security_id, security)}'
+            f'<SECNAME>{escape((security.get("name") or security_id)[:120])}</SECNAME>{ticker}</SECINFO></{tag}>\n'
+        )
+    parts.append('</SECLIST></SECLISTMSGSRSV1>\n')
+    return ''.join(parts)
+
+
+def ofx_transaction(row, security):
+    """One OFX 2 investment transaction element"""
+    fitid = escape(row['transaction_id'])
+    memo = escape(row['name'] or '')
+    trade_date = ofx_date(row['date'])
+    amount = row['amount'] or 0.0
+
+    if row['type'] in ('buy', 'sell') and row['security_id']:
+        tag, inner = ('BUYOTHER', 'INVBUY') if row['type'] == 'buy' else ('SELLOTHER', 'INVSELL')
+        # OFX totals are signed from the account's point of view
+        total = -abs(amount) if row['type'] == 'buy' else abs(amount)
+        return (
+            f'<{tag}><{inner}><INVTRAN><FITID>{fitid}</FITID><DTTRADE>{trade_date}</DTTRADE>'
+            f'<MEMO>{memo}</MEMO></INVTRAN>'
+            f'{ofx_secid(row["security_id"], security)}'
+            f'<UNITS>{format_number(abs(row["quantity"] or 0.0))}</UNITS>'
+            f'<UNITPRICE>{format_number(row["price"] or 0.0)}</UNITPRICE>'
+            f'<FEES>{format_number(row["fees"] or 0.0)}</FEES><TOTAL>{format_number(total)}</TOTAL>'
+            f'<SUBACCTSEC>CASH</SUBACCTSEC><SUBACCTFUND>CASH</SUBACCTFUND></{inner}></{tag}>\n'
+        )
+
+    # Plaid amounts are positive for outflows; OFX bank amounts are signed inflows
+    return (
+        f'<INVBANKTRAN><STMTTRN><TRNTYPE>{"DEBIT" if amount > 0 else "CREDIT"}</TRNTYPE>'
+        f'<DTPOSTED>{trade_date}</DTPOSTED><TRNAMT>{format_number(-amount)}</TRNAMT>'
+        f'<FITID>{fitid}</FITID><NAME>{memo[:32]}</NAME></STMTTRN>'
+        f'<SUBACCTFUND>CASH</SUBACCTFUND></INVBANKTRAN>\n'
+    )
+
+
+def stream_ofx(client_id, start=None, end=None, qfx=False):
+    """Generate an OFX 2 (or Quicken QFX) investment statement, one account at a time"""
+    first, last = db.session.execute(
+        select(func.min(transactions.c.date), func.max(transactions.c.date)).where(
+            *client_criteria(client_id, start, end)
+        )
+    ).one()
+    start, end = start or first, end or last
+    now = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        '<?OFX OFXHEADER="200" VERSION="220" SECURITY="NONE" OLDFILEUID="NONE" NEWFILEUID="NONE"?>\n'
+        '<OFX>\n<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0</CODE><SEVERITY>INFO</SEVERITY></STATUS>'
+        f'<DTSERVER>{now}</DTSERVER><LANGUAGE>ENG</LANGUAGE>'
+        + (f'<INTU.BID>{QFX_INTU_BID}</INTU.BID>' if qfx else '')
+        + '</SONRS></SIGNONMSGSRSV1>\n<INVSTMTMSGSRSV1>\n'
+    )
+
+    accounts = db.session.execute(
+        select(transactions.c.account_id).where(*client_criteria(client_id, start, end))
+        .distinct().order_by(transactions.c.account_id)
+    ).scalars().all()
+
+    traded = {}
+    for account in accounts:
+        yield (
+            f'<INVSTMTTRNRS><TRNUID>{escape(account)}</TRNUID><STATUS><CODE>0</CODE>'
+            f'<SEVERITY>INFO</SEVERITY></STATUS><INVSTMTRS><DTASOF>{now}</DTASOF><CURDEF>USD</CURDEF>'
+            f'<INVACCTFROM><BROKERID>quantumgrowth</BROKERID><ACCTID>{escape(account)}</ACCTID></INVACCTFROM>'
+            f'<INVTRANLIST><DTSTART>{ofx_date(start)}</DTSTART><DTEND>{ofx_date(end)}</DTEND>\n'
+        )
+        for rows in iter_transaction_chunks(client_id, start, end, account_id=account):
+            parts = []
+            for row, security in with_security(rows):
+                if row['type'] in ('buy', 'sell') and row['security_id']:
+                    traded[row['security_id']] = security
+                parts.append(ofx_transaction(row, security))
+            yield ''.join(parts)
+        yield '</INVTRANLIST></INVSTMTRS></INVSTMTTRNRS>\n'
+
+    yield '</INVSTMTMSGSRSV1>\n'
+    if traded:
+        yield ofx_security_list(traded)
+    yield '</OFX>\n'
+
+
+def stream_statement(client_id, export_format, start=None, end=None):
+    """Statement generator for export_format (csv, ofx or qfx)"""
+    if export_format == 'csv':
+        return stream_csv(client_id, start, end)
+    return stream_ofx(client_id, start, end, qfx=export_format == 'qfx')
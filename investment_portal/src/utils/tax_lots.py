@@ -0,0 +1,353 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.security import SecurityPrice
+from src.models.tax_lot import TaxLot, RealizedGain, LotSelection, LotCursor
+from src.models.transaction import InvestmentTransaction
+from src.models.user import db
+
+LONG_TERM_DAYS = 365
+QUANTITY_EPSILON = 1e-9
+TRANSACTION_BATCH_SIZE = 1000
+LOT_TRANSACTION_TYPES = ('buy', 'sell')
+
+# Trades that feed lots: buys and sells of a security from a linked item
+LOT_TRANSACTION_CRITERIA = (
+    InvestmentTransaction.type.in_(LOT_TRANSACTION_TYPES),
+    InvestmentTransaction.security_id.isnot(None),
+    InvestmentTransaction.plaid_item_id.isnot(None),
+)
+
+
+def transaction_value(transaction):
+    """Gross trade value of a transaction"""
+    quantity = abs(transaction.quantity or 0.0)
+    if transaction.amount is not None:
+        return abs(transaction.amount)
+    return quantity * (transaction.price or 0.0)
+
+
+def reset_client(client_id):
+    """Drop a client's lots and realized gains so history can be replayed"""
+    RealizedGain.query.filter_by(client_id=client_id).delete(synchronize_session=False)
+    TaxLot.query.filter_by(client_id=client_id).delete(synchronize_session=False)
+
+
+def lock_cursor(client_id):
+    """Create the client's cursor if missing and hold its row lock until commit
+
+    Serializes concurrent runs for one client (a sync job and a lot selection,
+    say), so pending transactions are never applied twice.
+    """
+    row = {'client_id': client_id, 'last_transaction_id': 0, 'updated_at': datetime.utcnow()}
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        # On SQLite the insert also takes the database write lock up front
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert(LotCursor.__table__).values(row)
+        db.session.execute(insert.on_conflict_do_nothing(index_elements=['client_id']))
+    elif db.session.get(LotCursor, client_id) is None:
+        db.session.add(LotCursor(**row))
+        db.session.flush()
+    return LotCursor.query.filter_by(client_id=client_id).with_for_update().populate_existing().one()
+
+
+class LotBook:
+    """Open lots of one client, loaded per (account, security) on first use"""
+
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self._lots = {}
+
+    def lots(self, account_id, security_id):
+        key = (account_id, security_id)
+        if key not in self._lots:
+            self._lots[key] = TaxLot.query.filter_by(
+                client_id=self.client_id,
+                account_id=account_id,
+                security_id=security_id,
+                is_open=True
+            ).order_by(TaxLot.acquired_date, TaxLot.id).all()
+        return self._lots[key]
+
+    def open_lot(self, transaction):
+        quantity = abs(transaction.quantity or 0.0)
+        if quantity <= QUANTITY_EPSILON:
+            return
+        cost = transaction_value(transaction) + (transaction.fees or 0.0)
+        lot = TaxLot(
+            client_id=self.client_id,
+            account_id=transaction.account_id,
+            security_id=transaction.security_id,
+            open_transaction_id=transaction.id,
+            acquired_date=transaction.date,
+            quantity_original=quantity,
+            quantity_open=quantity,
+            cost_per_unit=cost / quantity,
+            is_open=True
+        )
+        db.session.add(lot)
+        self.lots(transaction.account_id, transaction.security_id).append(lot)
+
+    def close(self, transaction, selections):
+        """Match a sell against selected lots first, then FIFO"""
+        quantity = abs(transaction.quantity or 0.0)
+        if quantity <= QUANTITY_EPSILON:
+            return
+        proceeds_per_unit = (transaction_value(transaction) - (transaction.fees or 0.0)) / quantity
+        lots = self.lots(transaction.account_id, transaction.security_id)
+        remaining = quantity
+
+        # Specific-ID instructions name lots by their opening transaction
+        for open_transaction_id, selected_quantity in selections:
+            lot = next((lot for lot in lots if lot.open_transaction_id == open_transaction_id), None)
+            if lot is not None and lot.acquired_date <= transaction.date:
+                remaining -= self._draw(transaction, lot, min(selected_quantity, remaining), proceeds_per_unit)
+
+        for lot in list(lots):
+            if remaining <= QUANTITY_EPSILON:
+                break
+            remaining -= self._draw(transaction, lot, remaining, proceeds_per_unit)
+
+        lots[:] = [lot for lot in lots if lot.is_open]
+
+        if remaining > QUANTITY_EPSILON:
+            # Sold more than the known history holds; record without a basis
+            db.session.add(RealizedGain(
+                client_id=self.client_id,
+                account_id=transaction.account_id,
+                security_id=transaction.security_id,
+                sell_transaction_id=transaction.id,
+                sold_date=transaction.date,
+                quantity=remaining,
+                proceeds=round(remaining * proceeds_per_unit, 2)
+            ))
+
+    def _draw(self, transaction, lot, quantity, proceeds_per_unit):
+        quantity = min(quantity, lot.quantity_open)
+        if quantity <= QUANTITY_EPSILON:
+            return 0.0
+        if lot.id is None:
+            db.session.flush()
+        proceeds = quantity * proceeds_per_unit
+        cost_basis = quantity * lot.cost_per_unit
+        db.session.add(RealizedGain(
+            client_id=self.client_id,
+            account_id=transaction.account_id,
+            security_id=transaction.security_id,
+            lot_id=lot.id,
+            sell_transaction_id=transaction.id,
+            acquired_date=lot.acquired_date,
+            sold_date=transaction.date,
+            quantity=quantity,
+            proceeds=round(proceeds, 2),
+            cost_basis=round(cost_basis, 2),
+            gain=round(proceeds - cost_basis, 2),
+            term='long' if (transaction.date - lot.acquired_date).days > LONG_TERM_DAYS else 'short'
+        ))
+        lot.quantity_open -= quantity
+        if lot.quantity_open <= QUANTITY_EPSILON:
+            lot.quantity_open = 0.0
+            lot.is_open = False
+        return quantity
+
+
+def apply_client(client_id, rebuild=False):
+    """Apply transactions stored since the last run to a client's lots
+
+    Returns the number of buy/sell transactions applied. If new history is
+    dated before what has already been applied, or rebuild is set, the client
+    is replayed from scratch so lot order stays correct.
+    """
+    cursor = lock_cursor(client_id)
+    last_id = cursor.last_transaction_id
+
+    newest_id, earliest_date = db.session.query(
+        func.max(InvestmentTransaction.id),
+        func.min(case((and_(*LOT_TRANSACTION_CRITERIA), InvestmentTransaction.date)))
+    ).filter(
+        InvestmentTransaction.client_id == client_id,
+        InvestmentTransaction.id > last_id
+    ).one()
+
+    # Only a back-dated trade changes lot order; cash and fee rows never do
+    if rebuild or (earliest_date is not None and cursor.last_date and earliest_date < cursor.last_date):
+        reset_client(client_id)
+        last_id = 0
+        cursor.last_date = None
+        newest_id = db.session.query(func.max(InvestmentTransaction.id)).filter(
+            InvestmentTransaction.client_id == client_id
+        ).scalar()
+
+    if newest_id is None:
+        cursor.last_transaction_id = last_id
+        db.session.commit()
+        return 0
+
+    selections = defaultdict(list)
+    for selection in LotSelection.query.filter_by(client_id=client_id).order_by(LotSelection.id):
+        selections[selection.sell_transaction_id].append((selection.open_transaction_id, selection.quantity))
+
+    book = LotBook(client_id)
+    applied = 0
+    last_date = cursor.last_date
+    pending = InvestmentTransaction.query.filter(
+        InvestmentTransaction.client_id == client_id,
+        InvestmentTransaction.id > last_id,
+        InvestmentTransaction.id <= newest_id,
+        *LOT_TRANSACTION_CRITERIA
+    ).order_by(InvestmentTransaction.date, InvestmentTransaction.id).yield_per(TRANSACTION_BATCH_SIZE)
+
+    for transaction in pending:
+        if transaction.type == 'buy':
+            book.open_lot(transaction)
+        else:
+            book.close(transaction, selections.get(transaction.id, ()))
+        last_date = max(last_date, transaction.date) if last_date else transaction.date
+        applied += 1
+
+    cursor.last_transaction_id = newest_id
+    cursor.last_date = last_date
+    db.session.commit()
+    return applied
+
+
+def add_lot_selection(client_id, sell_transaction_id, open_transaction_id, quantity):
+    """Record a specific-ID instruction and re-derive the client's lots
+
+    Raises LookupError when either transaction is not the client's buy/sell,
+    and ValueError when the lot cannot back the sell.
+    """
+    sell = InvestmentTransaction.query.filter_by(id=sell_transaction_id, client_id=client_id, type='sell').first()
+    buy = InvestmentTransaction.query.filter_by(id=open_transaction_id, client_id=client_id, type='buy').first()
+    if not sell or not buy:
+        raise LookupError('Transaction not found')
+    if quantity <= 0:
+        raise ValueError('quantity must be positive')
+    if (sell.account_id, sell.security_id) != (buy.account_id, buy.security_id):
+        raise ValueError('Lot must be a buy of the same security in the same account')
+    if buy.date > sell.date:
+        raise ValueError('Lot must be acquired on or before the sell date')
+
+    db.session.add(LotSelection(
+        client_id=client_id,
+        sell_transaction_id=sell_transaction_id,
+        open_transaction_id=open_transaction_id,
+        quantity=quantity
+    ))
+    # The sell may already be matched FIFO; replay history with the instruction
+    return apply_client(client_id, rebuild=True)
+
+
+def discard_transactions(client_id, *criteria):
+    """Delete a client's transactions matching criteria and the lot state built on them
+
+    Takes the cursor lock and rewinds it, so the next apply_client replays
+    the remaining history. The caller commits.
+    """
+    cursor = lock_cursor(client_id)
+    reset_client(client_id)
+    cursor.last_transaction_id = 0
+    cursor.last_date = None
+
+    discarded = select(InvestmentTransaction.id).where(InvestmentTransaction.client_id == client_id, *criteria)
+    LotSelection.query.filter(
+        LotSelection.client_id == client_id,
+        or_(LotSelection.sell_transaction_id.in_(discarded), LotSelection.open_transaction_id.in_(discarded))
+    ).delete(synchronize_session=False)
+    return InvestmentTransaction.query.filter(
+        InvestmentTransaction.client_id == client_id, *criteria
+    ).delete(synchronize_session=False)
+
+
+def apply_all_clients(progress=None):
+    """Bring every client with new transactions up to date; return {client_id: applied}"""
+    client_ids = db.session.execute(
+        select(InvestmentTransaction.client_id)
+        .outerjoin(LotCursor, LotCursor.client_id == InvestmentTransaction.client_id)
+        .where(InvestmentTransaction.id > func.coalesce(LotCursor.last_transaction_id, 0))
+        .distinct()
+    ).scalars().all()
+    applied = {}
+    for index, client_id in enumerate(client_ids):
+        if progress:
+            progress(100.0 * index / len(client_ids), f'Applying transactions for client {index + 1} of {len(client_ids)}')
+        applied[client_id] = apply_client(client_id)
+    return applied
+
+
+def realized_totals(year=None, client_id=None):
+    """Realized proceeds, basis and gain per client and term, in one grouped query"""
+    query = db.session.query(
+        RealizedGain.client_id,
+        RealizedGain.term,
+        func.sum(RealizedGain.proceeds),
+        func.sum(RealizedGain.cost_basis),
+        func.sum(RealizedGain.gain)
+    )
+    if client_id is not None:
+        query = query.filter(RealizedGain.client_id == client_id)
+    if year:
+        query = query.filter(
+            RealizedGain.sold_date >= f'{year}-01-01',
+            RealizedGain.sold_date <= f'{year}-12-31'
+        )
+    return query.group_by(RealizedGain.client_id, RealizedGain.term).all()
+
+
+def unrealized_totals(client_id=None):
+    """Open-lot basis and market value per client from the latest closes"""
+    open_cost = TaxLot.quantity_open * TaxLot.cost_per_unit
+    query = db.session.query(
+        TaxLot.client_id,
+        func.sum(open_cost),
+        func.sum(TaxLot.quantity_open * SecurityPrice.close_price),
+        func.sum(case((SecurityPrice.close_price.isnot(None), open_cost), else_=0.0)),
+        func.sum(case((SecurityPrice.close_price.is_(None), 1), else_=0))
+    ).outerjoin(
+        SecurityPrice, SecurityPrice.security_id == TaxLot.security_id
+    ).filter(TaxLot.is_open.is_(True))
+    if client_id is not None:
+        query = query.filter(TaxLot.client_id == client_id)
+    return query.group_by(TaxLot.client_id).all()
+
+
+def gain_reports(year=None, client_id=None):
+    """Realized and unrealized gain report per client"""
+    reports = {}
+
+    def report(report_client_id):
+        return reports.setdefault(report_client_id, {
+            'client_id': report_client_id,
+            'year': year,
+            'realized': {
+                term: {'proceeds': 0.0, 'cost_basis': 0.0, 'gain': 0.0}
+                for term in ('short', 'long', 'unmatched')
+            },
+            'unrealized': {'cost_basis': 0.0, 'market_value': 0.0, 'gain': 0.0, 'unpriced_lots': 0}
+        })
+
+    for report_client_id, term, proceeds, cost_basis, gain in realized_totals(year, client_id):
+        bucket = report(report_client_id)['realized'][term or 'unmatched']
+        bucket['proceeds'] = round(proceeds or 0.0, 2)
+        bucket['cost_basis'] = round(cost_basis or 0.0, 2)
+        bucket['gain'] = round(gain or 0.0, 2)
+
+    for report_client_id, cost_basis, market_value, priced_cost, unpriced in unrealized_totals(client_id):
+        unrealized = report(report_client_id)['unrealized']
+        unrealized['cost_basis'] = round(cost_basis or 0.0, 2)
+        unrealized['market_value'] = round(market_value or 0.0, 2)
+        unrealized['gain'] = round((market_value or 0.0) - (priced_cost or 0.0), 2)
+        unrealized['unpriced_lots'] = unpriced or 0
+
+    return [reports[key] for key in sorted(reports)]
+
+
+def run_gain_reports(year=None):
+    """Batch mode: apply pending history for every client, then report all of them"""
+    applied = apply_all_clients()
+    return {
+        'clients_updated': len(applied),
+        'transactions_applied': sum(applied.values()),
+        'reports': gain_reports(year)
+    }
@@ -0,0 +1,52 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from src.models.user import db
+from src.models.client import Client
+from src.models.plaid import PlaidItem  # noqa: F401
+from src.models.security import Security, SecurityPrice  # noqa: F401
+from src.models.holding import Holding, ClientValuation  # noqa: F401
+from src.models.transaction import InvestmentTransaction  # noqa: F401
+from src.models.tax_lot import TaxLot, RealizedGain, LotSelection, LotCursor  # noqa: F401
+from src.models.job import Job  # noqa: F401
+from src.models.analytics import DailyActivity  # noqa: F401
+from src.routes.plaid import plaid_bp
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test',
+        SQLALCHEMY_DATABASE_URI='sqlite:///:memory:',
+        SQLALCHEMY_TRACK_MODIFICATIONS=False
+    )
+    db.init_app(app)
+    app.register_blueprint(plaid_bp, url_prefix='/api/plaid')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client_id(app):
+    client = Client(email='client@example.com', first_name='Test', last_name='Client')
+    client.set_password('password')
+    db.session.add(client)
+    db.session.commit()
+    return client.id
+
+
+@pytest.fixture
+def http(app, client_id):
+    http = app.test_client()
+    with http.session_transaction() as session:
+        session['client_id'] = client_id
+    return http
@@ -0,0 +1,32 @@
+from src.models.tax_lot import TaxLot
+from src.models.transaction import InvestmentTransaction
+
+
+def link_and_sync(http):
+    response = http.post('/api/plaid/exchange_public_token', json={'public_token': 'public-test'})
+    assert response.status_code == 200
+    response = http.post('/api/plaid/items/sync')
+    assert response.status_code == 200
+    return http.get('/api/plaid/items').get_json()['items'][-1]['id']
+
+
+def test_relink_does_not_duplicate_history(http, client_id):
+    item_id = link_and_sync(http)
+    stored = InvestmentTransaction.query.filter_by(client_id=client_id).count()
+    assert stored == 3
+    assert TaxLot.query.filter_by(client_id=client_id).count() == 3
+
+    assert http.delete(f'/api/plaid/items/{item_id}').status_code == 200
+    link_and_sync(http)
+
+    assert InvestmentTransaction.query.filter_by(client_id=client_id).count() == stored
+    assert TaxLot.query.filter_by(client_id=client_id).count() == 3
+    csv_rows = http.get('/api/plaid/transactions/export?format=csv').get_data(as_text=True).strip().splitlines()
+    assert len(csv_rows) == stored + 1
+
+
+def test_resync_is_idempotent(http, client_id):
+    link_and_sync(http)
+    http.post('/api/plaid/items/sync')
+
+    assert InvestmentTransaction.query.filter_by(client_id=client_id).count() == 3
@@ -0,0 +1,59 @@
+from datetime import date
+from src.models.user import db
+from src.models.tax_lot import LotCursor, RealizedGain, TaxLot
+from src.models.transaction import InvestmentTransaction
+from src.utils.tax_lots import apply_client
+
+
+def add_transaction(client_id, item_id, key, day, type, quantity=None, security_id='sec_001', amount=100.0):
+    transaction = InvestmentTransaction(
+        client_id=client_id,
+        plaid_item_id=item_id,
+        transaction_id=key,
+        account_id='acc_001',
+        security_id=security_id,
+        date=day,
+        type=type,
+        quantity=quantity,
+        amount=amount
+    )
+    db.session.add(transaction)
+    db.session.commit()
+    return transaction
+
+
+def linked_item(http):
+    http.post('/api/plaid/exchange_public_token', json={'public_token': 'public-test'})
+    return http.get('/api/plaid/items').get_json()['items'][0]['id']
+
+
+def test_backdated_cash_row_does_not_replay_history(http, client_id):
+    item_id = linked_item(http)
+    add_transaction(client_id, item_id, 'b1', date(2025, 3, 1), 'buy', 10)
+    apply_client(client_id)
+    lot_id = TaxLot.query.filter_by(client_id=client_id).one().id
+
+    add_transaction(client_id, item_id, 'c1', date(2025, 1, 1), 'cash', security_id=None)
+    apply_client(client_id)
+
+    assert TaxLot.query.filter_by(client_id=client_id).one().id == lot_id
+    assert db.session.get(LotCursor, client_id).last_date == date(2025, 3, 1)
+
+
+def test_selection_rejects_lot_acquired_after_sell(http, client_id):
+    item_id = linked_item(http)
+    early = add_transaction(client_id, item_id, 'b1', date(2025, 1, 1), 'buy', 10)
+    sell = add_transaction(client_id, item_id, 's1', date(2025, 2, 1), 'sell', -5)
+    late = add_transaction(client_id, item_id, 'b2', date(2025, 3, 1), 'buy', 10)
+
+    response = http.post('/api/plaid/tax-lots/selections', json={
+        'sell_transaction_id': sell.id, 'open_transaction_id': late.id, 'quantity': 5
+    })
+    assert response.status_code == 400
+
+    response = http.post('/api/plaid/tax-lots/selections', json={
+        'sell_transaction_id': sell.id, 'open_transaction_id': early.id, 'quantity': 5
+    })
+    assert response.status_code == 201
+    gain = RealizedGain.query.filter_by(sell_transaction_id=sell.id).one()
+    assert gain.acquired_date == date(2025, 1, 1)